@@ -0,0 +1,164 @@
+"""Headless batch processing of many standard-curve runs.
+
+Each run is a sub-directory of the input directory containing
+
+- ``standards.csv``: one row per standard with a concentration column
+  (a word in its name starting with "conc" or "µg/mL") and an absorbance
+  column (a word starting with "abs"), e.g. the "Standard Curve Data" table from the app, and
+- either ``unknowns.csv`` with ``Dilution Factor`` and absorbance columns
+  (plus any label columns, which are kept), or a plate-reader export
+  ``plate.csv``/``plate.xlsx`` with a ``plate_map.csv``/``plate_map.xlsx`` of
+  dilution factors (see :mod:`plate_import`).
+
+Runs are fitted and back-calculated in parallel on a process pool and all
+samples are written to one combined CSV::
+
+    python batch_cli.py runs/ -o results.csv --start-conc 15.6 --end-conc 1000
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from plate_import import (
+    ABSORBANCE_COLUMN,
+    DILUTION_COLUMN,
+    back_calculate_plate,
+    back_calculate_samples,
+    find_column,
+    read_plate_absorbance,
+    read_plate_map,
+    read_table,
+)
+from standard_curve import StandardCurve, linear_range_mask
+
+TABLE_SUFFIXES = (".csv", ".xlsx")
+
+
+def _find_file(run_dir, stem):
+    for suffix in TABLE_SUFFIXES:
+        path = run_dir / f"{stem}{suffix}"
+        if path.exists():
+            return path
+    return None
+
+
+def _column(table, value_name, *keywords):
+    # Same word-start matching as the plate import, which refuses to guess.
+    column = find_column(table, value_name, *keywords)
+    if column is None:
+        raise ValueError(f"No column matching {' / '.join(keywords)} in {list(table.columns)}")
+    return column
+
+
+def read_standards(path):
+    """``(x, y)`` arrays of standard concentrations and absorbances."""
+    table = read_table(path)
+    x = pd.to_numeric(table[_column(table, "Concentration", "conc", "µg/ml", "ug/ml")], errors="coerce").to_numpy(dtype=float)
+    y = pd.to_numeric(table[_column(table, ABSORBANCE_COLUMN, "abs")], errors="coerce").to_numpy(dtype=float)
+    keep = ~(np.isnan(x) | np.isnan(y))
+    return x[keep], y[keep]
+
+
+def read_unknowns(path):
+    """Unknown-sample table with numeric dilution factor and absorbance columns."""
+    table = read_table(path)
+    table = table.rename(columns={
+        _column(table, DILUTION_COLUMN, "factor"): DILUTION_COLUMN,
+        _column(table, ABSORBANCE_COLUMN, "abs"): ABSORBANCE_COLUMN,
+    })
+    table[DILUTION_COLUMN] = pd.to_numeric(table[DILUTION_COLUMN], errors="coerce")
+    table[ABSORBANCE_COLUMN] = pd.to_numeric(table[ABSORBANCE_COLUMN], errors="coerce")
+    return table[table[DILUTION_COLUMN].notna()].reset_index(drop=True)
+
+
+def process_run(run_dir, start_conc=None, end_conc=None):
+    """Fit one run and back-calculate all of its samples.
+
+    Returns one row per sample with the run name and fit statistics attached.
+    """
+    run_dir = Path(run_dir)
+    standards_path = _find_file(run_dir, "standards")
+    if standards_path is None:
+        raise ValueError(f"{run_dir}: no standards.csv")
+    x_all, y_all = read_standards(standards_path)
+    start = x_all.min() if start_conc is None else start_conc
+    end = x_all.max() if end_conc is None else end_conc
+    mask = linear_range_mask(x_all, start, end)
+    curve = StandardCurve.fit(x_all[mask], y_all[mask], start, end)
+
+    plate_path = _find_file(run_dir, "plate")
+    unknowns_path = _find_file(run_dir, "unknowns")
+    if plate_path is not None:
+        plate_map_path = _find_file(run_dir, "plate_map")
+        if plate_map_path is None:
+            raise ValueError(f"{run_dir}: plate export without a plate_map file")
+        samples = back_calculate_plate(curve, read_plate_absorbance(plate_path), read_plate_map(plate_map_path))
+    elif unknowns_path is not None:
+        samples = back_calculate_samples(curve, read_unknowns(unknowns_path))
+    else:
+        raise ValueError(f"{run_dir}: no unknowns.csv or plate.csv")
+
+    samples.insert(0, "Run", run_dir.name)
+    samples["Slope"] = curve.slope
+    samples["Intercept"] = curve.intercept
+    samples["R-squared"] = curve.r_squared
+    return samples
+
+
+def _process_run_safely(args):
+    run_dir, start_conc, end_conc = args
+    try:
+        return run_dir, process_run(run_dir, start_conc, end_conc), None
+    except (ValueError, KeyError, OSError, ImportError) as exc:
+        return run_dir, None, str(exc)
+
+
+def process_runs(run_dirs, start_conc=None, end_conc=None, jobs=None):
+    """Process ``run_dirs`` on a pool of ``jobs`` worker processes.
+
+    Returns ``(combined_results, errors)`` where ``errors`` maps each failed
+    run directory to its error message.
+    """
+    tasks = [(run_dir, start_conc, end_conc) for run_dir in run_dirs]
+    jobs = min(jobs or os.cpu_count() or 1, max(len(tasks), 1))
+    if jobs == 1:
+        outcomes = list(map(_process_run_safely, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            outcomes = list(pool.map(_process_run_safely, tasks, chunksize=max(1, len(tasks) // (jobs * 4))))
+
+    results = [frame for _, frame, _ in outcomes if frame is not None]
+    errors = {run_dir: error for run_dir, _, error in outcomes if error is not None}
+    combined = pd.concat(results, ignore_index=True) if results else pd.DataFrame()
+    return combined, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fit and back-calculate a directory of standard-curve runs.")
+    parser.add_argument("runs_dir", type=Path, help="directory with one sub-directory per run")
+    parser.add_argument("-o", "--output", type=Path, default=Path("standard_curve_results.csv"),
+                        help="combined results CSV (default: %(default)s)")
+    parser.add_argument("--start-conc", type=float, help="lowest standard in the linear range (default: lowest standard)")
+    parser.add_argument("--end-conc", type=float, help="highest standard in the linear range (default: highest standard)")
+    parser.add_argument("-j", "--jobs", type=int, help="worker processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    run_dirs = sorted(path for path in args.runs_dir.iterdir() if path.is_dir())
+    if not run_dirs:
+        parser.error(f"no run directories found in {args.runs_dir}")
+
+    combined, errors = process_runs(run_dirs, args.start_conc, args.end_conc, args.jobs)
+    for run_dir, error in errors.items():
+        print(f"skipped {run_dir.name}: {error}", file=sys.stderr)
+    combined.to_csv(args.output, index=False)
+    print(f"{len(run_dirs) - len(errors)} runs, {len(combined)} samples -> {args.output}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
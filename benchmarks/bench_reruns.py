@@ -0,0 +1,191 @@
+"""Rerun benchmarks for standardcurve1.py.
+
+Drives the app with Streamlit's ``AppTest`` harness (no server or browser
+needed) through the interactions that trigger a rerun and times each one:
+
+- ``cold_start``: first render with the scenario's data already entered,
+- ``standards_edit``: one standard absorbance changed,
+- ``range_change``: a different start concentration for the fit,
+- ``unknown_edit``: one unknown absorbance changed,
+- ``download``: generating the combined results CSV on click.
+
+Each table size runs in a fresh interpreter so Streamlit's caches start
+empty. Besides the wall time of every step, the time spent in each pipeline
+stage that recomputed during the step is recorded, so a regression can be
+traced to the stage that caused it::
+
+    python benchmarks/bench_reruns.py --runs 3 --output bench_reruns.json
+    python benchmarks/bench_reruns.py --sizes tutorial plate_384
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+APP = Path(__file__).resolve().parent.parent / "standardcurve1.py"
+
+# name -> (replicate readings per standard, unknown samples)
+SIZES = {
+    "tutorial": (1, 3),
+    "replicates_96": (3, 96),
+    "plate_384": (3, 384),
+    "plate_1536": (6, 1536),
+    "plate_6144": (12, 6144),
+}
+STEPS = ("cold_start", "standards_edit", "range_change", "unknown_edit", "download")
+EXPORT_FILE_SUFFIX = "_standard_curve_results.csv"
+
+
+def _unknown_rows(n_unknowns):
+    dilutions = (10, 20, 50, 100)
+    return [
+        {
+            "Dilution": f"S{i + 1}",
+            "Dilution Factor": dilutions[i % len(dilutions)],
+            "Absorbance (510 nm)": 0.05 + 1.4 * ((i * 37) % 101) / 100,
+        }
+        for i in range(n_unknowns)
+    ]
+
+
+def _replicate_edits(n_replicates):
+    # Replicates scatter by ±1% around the default reading of each standard.
+    defaults = [2.000, 1.450, 0.850, 0.440, 0.220, 0.110, 0.055, 0.028, 0.000]
+    return {
+        str(row): {
+            f"Replicate {rep} (510 nm)": round(value * (1 + 0.01 * ((row + rep) % 3 - 1)), 4)
+            for rep in range(2, n_replicates + 1)
+        }
+        for row, value in enumerate(defaults)
+    }
+
+
+def _editor_state(edited_rows=None, added_rows=None):
+    return {"edited_rows": edited_rows or {}, "added_rows": added_rows or [], "deleted_rows": []}
+
+
+def measure_size(n_replicates, n_unknowns):
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.testing.v1 import AppTest
+
+    # AppTest has no browser to click the download button, so the deferred
+    # export callables are captured when they are registered and called here.
+    deferred = {}
+    register = MediaFileManager.add_deferred
+
+    def capture(self, data_callable, mimetype, coordinates, file_name=None):
+        deferred[file_name] = data_callable
+        return register(self, data_callable, mimetype, coordinates, file_name=file_name)
+
+    MediaFileManager.add_deferred = capture
+
+    at = AppTest.from_file(str(APP), default_timeout=600)
+    at.session_state["n_replicates"] = n_replicates
+    std_edits = _replicate_edits(n_replicates) if n_replicates > 1 else {}
+    unknown_rows = _unknown_rows(n_unknowns)
+    unknown_edits = {str(i): row for i, row in enumerate(unknown_rows[:3])}
+
+    def rerun():
+        # AppTest only applies a table edit set through session state to the
+        # next run, so both tables are re-entered before every rerun.
+        at.session_state["std_editor"] = _editor_state(std_edits)
+        at.session_state["unknown_editor"] = _editor_state(unknown_edits, unknown_rows[3:])
+        at.run()
+
+    results = {}
+    counts_before = {}
+
+    def step(name, action):
+        pipeline = at.session_state["pipeline"] if "pipeline" in at.session_state else None
+        counts_before.update(pipeline.recompute_counts if pipeline else {})
+        start = time.perf_counter()
+        action()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if at.exception:
+            raise RuntimeError(f"{name}: {at.exception[0].message}")
+        pipeline = at.session_state["pipeline"]
+        results[name] = {
+            "total_ms": elapsed_ms,
+            "stages_ms": {
+                stage: pipeline.durations[stage] * 1000
+                for stage, count in pipeline.recompute_counts.items()
+                if count > counts_before.get(stage, 0)
+            },
+        }
+
+    def edit_standard():
+        std_edits.setdefault("3", {})["Absorbance (510 nm)"] = 0.45
+        rerun()
+
+    def change_range():
+        at.selectbox(key="start_conc_select").set_value(62.5)
+        rerun()
+
+    def edit_unknown():
+        unknown_edits["0"] = dict(unknown_edits["0"], **{"Absorbance (510 nm)": 0.5})
+        rerun()
+
+    def download():
+        [export] = [fn for name, fn in deferred.items() if name.endswith(EXPORT_FILE_SUFFIX)]
+        export()
+
+    step("cold_start", rerun)
+    step("standards_edit", edit_standard)
+    step("range_change", change_range)
+    step("unknown_edit", edit_unknown)
+    step("download", download)
+    return results
+
+
+def _median_step(samples, step):
+    stages = {stage for sample in samples for stage in sample[step]["stages_ms"]}
+    return {
+        "total_ms": statistics.median(sample[step]["total_ms"] for sample in samples),
+        "stages_ms": {
+            stage: statistics.median(sample[step]["stages_ms"].get(stage, 0.0) for sample in samples)
+            for stage in sorted(stages)
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", choices=SIZES, default=list(SIZES),
+                        help="table sizes to run (default: all)")
+    parser.add_argument("--runs", type=int, default=3, help="samples per size (default: %(default)s)")
+    parser.add_argument("--output", type=Path, help="write the median timings to this JSON file")
+    parser.add_argument("--child", nargs=2, type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure_size(*args.child)))
+        return 0
+
+    report = {}
+    for size in args.sizes:
+        n_replicates, n_unknowns = SIZES[size]
+        samples = []
+        for _ in range(args.runs):
+            output = subprocess.run(
+                [sys.executable, __file__, "--child", str(n_replicates), str(n_unknowns)],
+                cwd=APP.parent, capture_output=True, text=True, check=True,
+            ).stdout
+            samples.append(json.loads(output.strip().splitlines()[-1]))
+        report[size] = {step: _median_step(samples, step) for step in STEPS}
+
+        print(f"{size} ({9 * n_replicates} standard readings, {n_unknowns} unknowns), median of {args.runs}:")
+        for step in STEPS:
+            timing = report[size][step]
+            stages = ", ".join(f"{stage} {ms:.1f}" for stage, ms in timing["stages_ms"].items())
+            print(f"  {step:<15} {timing['total_ms']:8.1f} ms   {stages or '-'}")
+
+    if args.output is not None:
+        args.output.write_text(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
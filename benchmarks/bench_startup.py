@@ -0,0 +1,69 @@
+"""Time-to-first-render benchmark for standardcurve1.py.
+
+Each sample runs the app once with Streamlit's ``AppTest`` harness in a fresh
+interpreter, so the app's own imports are cold just as they are for a new
+Streamlit worker. Streamlit itself is imported before the clock starts since
+a real server has already loaded it. Also reports which heavy optional
+modules the first render pulled in.
+
+    python benchmarks/bench_startup.py --runs 5 --budget-ms 3000
+
+Exits with status 1 if the median exceeds ``--budget-ms``.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+APP = Path(__file__).resolve().parent.parent / "standardcurve1.py"
+WATCHED_MODULES = ("matplotlib", "scipy", "altair")
+
+
+def measure_once():
+    from streamlit.testing.v1 import AppTest
+
+    start = time.perf_counter()
+    at = AppTest.from_file(str(APP), default_timeout=120).run()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return {
+        "first_render_ms": elapsed_ms,
+        "loaded": [name for name in WATCHED_MODULES if name in sys.modules],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="cold-start samples (default: %(default)s)")
+    parser.add_argument("--budget-ms", type=float, help="fail if the median time-to-first-render exceeds this")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure_once()))
+        return 0
+
+    samples = []
+    for _ in range(args.runs):
+        output = subprocess.run(
+            [sys.executable, __file__, "--child"],
+            cwd=APP.parent, capture_output=True, text=True, check=True,
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    timings = [sample["first_render_ms"] for sample in samples]
+    median = statistics.median(timings)
+    print(f"time to first render: median {median:.0f} ms, min {min(timings):.0f} ms, max {max(timings):.0f} ms ({args.runs} runs)")
+    print(f"heavy modules loaded on first render: {', '.join(samples[-1]['loaded']) or 'none'}")
+    if args.budget_ms is not None and median > args.budget_ms:
+        print(f"over budget: {median:.0f} ms > {args.budget_ms:.0f} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
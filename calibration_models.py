@@ -0,0 +1,290 @@
+"""Nonlinear calibration models: quadratic, 4PL and 5PL.
+
+Alternatives to the straight line in :mod:`standard_curve` for standard sets
+that bend or saturate at the top, so saturated standards don't have to be
+thrown away. Every model has an analytic inverse for back-calculating
+concentrations. The logistic models are fitted by Levenberg-Marquardt with a
+vectorized analytic Jacobian and can be warm-started from a previous fit,
+which usually converges in a handful of iterations after a small edit; a
+fit that does not converge raises instead of returning a half-fitted curve.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from standard_curve import WEIGHTING_NONE, CalibrationRangeMixin, StandardCurve, fit_weights
+
+MODEL_LINEAR = StandardCurve.model
+MODEL_QUADRATIC = "quadratic"
+MODEL_4PL = "4PL"
+MODEL_5PL = "5PL"
+CALIBRATION_MODELS = (MODEL_LINEAR, MODEL_QUADRATIC, MODEL_4PL, MODEL_5PL)
+
+MIN_POINTS = {MODEL_LINEAR: 2, MODEL_QUADRATIC: 3, MODEL_4PL: 4, MODEL_5PL: 5}
+
+
+def _weighted_r_squared(y, fitted, weights):
+    y_mean = weights @ y / weights.sum()
+    total_ss = weights @ (y - y_mean) ** 2
+    if total_ss <= 0:
+        return 0.0
+    return float(1.0 - weights @ (y - fitted) ** 2 / total_ss)
+
+
+@dataclass(frozen=True)
+class NonlinearCurve(CalibrationRangeMixin):
+    """Fitted nonlinear calibration; ``params`` are model-specific."""
+
+    params: tuple
+    r_squared: float
+    start_conc: float
+    end_conc: float
+    n: int
+    weighting: str = WEIGHTING_NONE
+    iterations: int = 0
+
+
+@dataclass(frozen=True)
+class QuadraticCurve(NonlinearCurve):
+    """``A = c0 + c1 * C + c2 * C²`` with ``params = (c0, c1, c2)``."""
+
+    model = MODEL_QUADRATIC
+
+    @property
+    def equation(self):
+        c0, c1, c2 = self.params
+        return f"Absorbance = {c2:.4g} * Concentration² + {c1:.5f} * Concentration + {c0:.4f}"
+
+    def predict(self, conc):
+        c0, c1, c2 = self.params
+        conc = np.asarray(conc, dtype=float)
+        return c0 + conc * (c1 + conc * c2)
+
+    def inverse_predict(self, absorbance):
+        """Root of the quadratic on the branch that contains the fitted range."""
+        c0, c1, c2 = self.params
+        absorbance = np.asarray(absorbance, dtype=float)
+        if c2 == 0:
+            return (absorbance - c0) / c1
+        with np.errstate(invalid="ignore", divide="ignore"):
+            root_disc = np.sqrt(c1 * c1 - 4 * c2 * (c0 - absorbance))
+            # Numerically stable pair of roots (avoids cancellation when c2 is tiny).
+            q = -0.5 * (c1 + np.copysign(root_disc, c1))
+            root_a = q / c2
+            root_b = (c0 - absorbance) / q
+        vertex = -c1 / (2 * c2)
+        if (self.start_conc + self.end_conc) / 2 >= vertex:
+            return np.fmax(root_a, root_b)
+        return np.fmin(root_a, root_b)
+
+
+@dataclass(frozen=True)
+class LogisticCurve(NonlinearCurve):
+    """Four/five-parameter logistic ``A = d + (a - d) / (1 + (C / c)^b)^g``.
+
+    ``params = (a, b, c, d)`` for 4PL (``g = 1``) or ``(a, b, c, d, g)`` for
+    5PL; ``a`` is the response at zero concentration and ``d`` the plateau.
+    """
+
+    @property
+    def model(self):
+        return MODEL_5PL if len(self.params) == 5 else MODEL_4PL
+
+    def _unpack(self):
+        a, b, c, d = self.params[:4]
+        g = self.params[4] if len(self.params) == 5 else 1.0
+        return a, b, c, d, g
+
+    @property
+    def equation(self):
+        a, b, c, d, g = self._unpack()
+        text = f"Absorbance = {d:.4f} + ({a:.4f} - {d:.4f}) / (1 + (Concentration / {c:.4g})^{b:.4f})"
+        return text + (f"^{g:.4f}" if len(self.params) == 5 else "")
+
+    def predict(self, conc):
+        a, b, c, d, g = self._unpack()
+        conc = np.asarray(conc, dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            return d + (a - d) / (1 + np.power(conc / c, b)) ** g
+
+    def inverse_predict(self, absorbance):
+        """``C = c * (((a - d) / (A - d))^(1/g) - 1)^(1/b)``; NaN outside the asymptotes."""
+        a, b, c, d, g = self._unpack()
+        absorbance = np.asarray(absorbance, dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            return c * np.power(np.power((a - d) / (absorbance - d), 1 / g) - 1, 1 / b)
+
+
+def _logistic_terms(x, theta, five):
+    """Model values and Jacobian for ``theta = (a, b, log c, d[, log g])``.
+
+    ``c`` and ``g`` are optimised on a log scale so they stay positive.
+    Zero concentrations take the limit ``(x / c)^b -> 0`` (``b > 0``).
+    """
+    a, b, log_c, d = theta[:4]
+    g = np.exp(theta[4]) if five else 1.0
+    positive = x > 0
+    log_ratio = np.where(positive, np.log(np.where(positive, x, 1.0)) - log_c, 0.0)
+    with np.errstate(over="ignore"):
+        u = np.where(positive, np.exp(b * log_ratio), 0.0)
+    s = 1 + u
+    s_pow = s ** -g
+    fitted = d + (a - d) * s_pow
+
+    dy_du = -(a - d) * g * s_pow / s
+    columns = [
+        s_pow,                      # d/da
+        dy_du * u * log_ratio,      # d/db
+        dy_du * (-b * u),           # d/dlog c
+        1 - s_pow,                  # d/dd
+    ]
+    if five:
+        columns.append(-(a - d) * s_pow * np.log(s) * g)  # d/dlog g
+    return fitted, np.column_stack(columns)
+
+
+def _levenberg_marquardt(x, y, sqrt_w, theta, five, lower, upper, max_iter=200, tol=1e-10):
+    """Bounded Levenberg-Marquardt; returns ``(theta, iterations, converged)``.
+
+    Parameters sitting on a bound with the gradient or the step pushing
+    outward are held there and the step is solved for the free ones only,
+    so a pinned 5PL asymmetry converges like a 4PL. Convergence is a negligible cost decrease
+    or step, or a vanishing projected gradient.
+    """
+    fitted, jac = _logistic_terms(x, theta, five)
+    resid = (y - fitted) * sqrt_w
+    cost = resid @ resid
+    damping = 1e-3
+    iterations = 0
+    converged = False
+    for iterations in range(1, max_iter + 1):
+        jac_w = jac * sqrt_w[:, None]
+        jtj = jac_w.T @ jac_w
+        gradient = jac_w.T @ resid
+        pinned = ((theta <= lower) & (gradient < 0)) | ((theta >= upper) & (gradient > 0))
+        free = ~pinned
+        scale = np.sqrt(np.diag(jtj) * max(cost, 1e-300))
+        if np.all(np.abs(gradient[free]) <= tol * scale[free] + 1e-300):
+            converged = True
+            break
+        try:
+            # A bound parameter that the step would push further out is held
+            # too, and the step re-solved without it.
+            while True:
+                step = np.zeros_like(theta)
+                block = jtj[np.ix_(free, free)]
+                step[free] = np.linalg.solve(block + damping * np.diag(np.diag(block) + 1e-12), gradient[free])
+                outward = free & (((theta <= lower) & (step < 0)) | ((theta >= upper) & (step > 0)))
+                if not outward.any():
+                    break
+                free &= ~outward
+        except np.linalg.LinAlgError:
+            damping *= 10
+            continue
+        candidate = np.clip(theta + step, lower, upper)
+        new_fitted, new_jac = _logistic_terms(x, candidate, five)
+        new_resid = (y - new_fitted) * sqrt_w
+        new_cost = new_resid @ new_resid
+        if np.isfinite(new_cost) and new_cost <= cost:
+            moved = np.max(np.abs(candidate - theta))
+            converged = cost - new_cost <= tol * max(cost, 1e-300) or moved < tol
+            theta, jac, resid, cost = candidate, new_jac, new_resid, new_cost
+            damping = max(damping / 10, 1e-12)
+            if converged:
+                break
+        else:
+            damping *= 10
+            if damping > 1e12:
+                break
+    return theta, iterations, converged
+
+
+def _logistic_initial_guess(x, y):
+    at_min = y[x == x.min()].mean()
+    at_max = y[x == x.max()].mean()
+    spread = at_max - at_min
+    positive = x[x > 0]
+    c = np.exp(np.mean(np.log(positive))) if len(positive) else 1.0
+    return np.array([at_min, 1.0, c, at_max + 0.2 * spread, 1.0])
+
+
+def fit_calibration(model, x, y, start_conc=None, end_conc=None, weighting=WEIGHTING_NONE, sd=None, initial=None):
+    """Fit one of :data:`CALIBRATION_MODELS` through the standards ``(x, y)``.
+
+    Arguments follow :meth:`standard_curve.StandardCurve.fit`. ``initial``
+    warm-starts the logistic models from a previous fit's ``params`` (4PL
+    parameters are accepted as a start for 5PL). Returns a curve object with
+    ``predict``, ``inverse_predict``, ``range_status``, ``equation`` and
+    ``r_squared``.
+    """
+    if model == MODEL_LINEAR:
+        return StandardCurve.fit(x, y, start_conc, end_conc, weighting, sd)
+    if model not in CALIBRATION_MODELS:
+        raise ValueError(f"Unknown calibration model {model!r}; expected one of {CALIBRATION_MODELS}.")
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    weights = fit_weights(weighting, x, sd)
+    keep = ~(np.isnan(x) | np.isnan(y) | np.isnan(weights))
+    x = x[keep]
+    y = y[keep]
+    weights = weights[keep]
+    if len(x) < MIN_POINTS[model]:
+        raise ValueError(f"A {model} fit needs at least {MIN_POINTS[model]} standards.")
+    common = dict(
+        start_conc=float(x.min() if start_conc is None else start_conc),
+        end_conc=float(x.max() if end_conc is None else end_conc),
+        n=len(x),
+        weighting=weighting,
+    )
+    sqrt_w = np.sqrt(weights)
+
+    if model == MODEL_QUADRATIC:
+        design = np.column_stack([np.ones_like(x), x, x * x])
+        params, *_ = np.linalg.lstsq(design * sqrt_w[:, None], y * sqrt_w, rcond=None)
+        r_squared = _weighted_r_squared(y, design @ params, weights)
+        # The usable-range logic needs a curve that is monotonic over the
+        # fitted range, so a parabola that turns over inside it is rejected.
+        c0, c1, c2 = params
+        vertex = -c1 / (2 * c2) if c2 != 0 else np.nan
+        if common["start_conc"] < vertex < common["end_conc"]:
+            raise ValueError(
+                f"The quadratic turns over at {vertex:.4g} µg/mL, inside the fitted range; "
+                "lower the end concentration or use a logistic model."
+            )
+        return QuadraticCurve(params=tuple(float(p) for p in params), r_squared=r_squared, **common)
+
+    five = model == MODEL_5PL
+    start = np.array(initial if initial is not None else _logistic_initial_guess(x, y), dtype=float)
+    if len(start) == 4:
+        start = np.append(start, 1.0)
+    theta = np.array([start[0], start[1], np.log(start[2]), start[3], np.log(start[4])])
+    # The inflection point is kept within a few decades of the standards and
+    # the asymmetry g within [0.1, 10]; outside those the 5PL is unidentifiable
+    # from a typical standard series and drifts off to degenerate solutions.
+    positive = x[x > 0]
+    if len(positive) == 0:
+        raise ValueError("A logistic fit needs standards above zero concentration.")
+    log_c_bounds = (np.log(positive.min()) - 3 * np.log(10), np.log(positive.max()) + 3 * np.log(10))
+    lower = np.array([-np.inf, -np.inf, log_c_bounds[0], -np.inf, np.log(0.1)])
+    upper = np.array([np.inf, np.inf, log_c_bounds[1], np.inf, np.log(10.0)])
+    if not five:
+        theta, lower, upper = theta[:4], lower[:4], upper[:4]
+    theta = np.clip(theta, lower, upper)
+    theta, iterations, converged = _levenberg_marquardt(x, y, sqrt_w, theta, five, lower, upper)
+    if not converged:
+        raise ValueError(
+            f"The {model} fit did not converge after {iterations} iterations; "
+            "try a simpler model or check the standards for typos."
+        )
+
+    params = [theta[0], theta[1], np.exp(theta[2]), theta[3]]
+    if five:
+        params.append(np.exp(theta[4]))
+    fitted, _ = _logistic_terms(x, theta, five)
+    return LogisticCurve(
+        params=tuple(float(p) for p in params),
+        r_squared=_weighted_r_squared(y, fitted, weights),
+        iterations=iterations,
+        **common,
+    )
@@ -0,0 +1,64 @@
+"""Per-section timing of the app's script runs.
+
+:class:`SectionTimer` measures wall-clock time spent in named sections of one
+rerun with a context manager, cheap enough to leave on permanently. The app
+shows the result in a timing panel when opened with ``?timing=1`` and, when
+the ``STANDARD_CURVE_TIMING_LOG`` environment variable is set, also writes one
+JSON line per rerun to the ``instrumentation`` logger so timings can be
+aggregated across sessions.
+"""
+import json
+import logging
+import sys
+import time
+from contextlib import contextmanager
+
+TIMING_LOG_ENV = "STANDARD_CURVE_TIMING_LOG"
+
+logger = logging.getLogger(__name__)
+
+
+def enable_json_logs(stream=None):
+    """Send the per-rerun JSON records to ``stream`` (default stderr), once."""
+    if not logger.handlers:
+        handler = logging.StreamHandler(stream or sys.stderr)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+
+class SectionTimer:
+    """Wall-clock seconds per named section of one script run.
+
+    Sections may nest (an inner section's time is also counted in the outer
+    one) and a name used twice accumulates.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sections = {}
+
+    @contextmanager
+    def section(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sections[name] = self.sections.get(name, 0.0) + time.perf_counter() - start
+
+    @property
+    def elapsed(self):
+        """Seconds since the timer was created."""
+        return time.perf_counter() - self.started
+
+    def record(self, **fields):
+        """JSON-serialisable summary in milliseconds, with ``fields`` added."""
+        return {
+            "total_ms": round(self.elapsed * 1000, 3),
+            "sections_ms": {name: round(seconds * 1000, 3) for name, seconds in self.sections.items()},
+            **fields,
+        }
+
+    def log(self, **fields):
+        logger.info(json.dumps(self.record(**fields)))
@@ -0,0 +1,89 @@
+"""Rerun-aware memoisation of the app's computation stages.
+
+Streamlit reruns the whole script on every interaction. A :class:`Pipeline`
+kept in ``st.session_state`` remembers each stage's result together with a
+fingerprint of the inputs that stage reads directly (widget values, edited
+tables). A stage is recomputed only when those inputs change or when a stage
+it depends on was recomputed; recomputing a stage marks everything downstream
+of it dirty, so upstream results never need to be hashed again.
+"""
+import hashlib
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def _update_digest(digest, value):
+    if isinstance(value, pd.DataFrame):
+        digest.update(repr(value.columns.tolist()).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(f"{value.dtype.str}{value.shape}".encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (tuple, list)):
+        digest.update(f"{type(value).__name__}{len(value)}".encode())
+        for item in value:
+            _update_digest(digest, item)
+    else:
+        digest.update(repr(value).encode())
+    digest.update(b"\0")
+
+
+def fingerprint(*values):
+    """Short hex digest of DataFrames, arrays, scalars and tuples of them."""
+    digest = hashlib.blake2b(digest_size=16)
+    for value in values:
+        _update_digest(digest, value)
+    return digest.hexdigest()
+
+
+class Pipeline:
+    """Stage results with per-stage dirty flags.
+
+    ``dependencies`` maps each stage name to the stages it reads from, e.g.
+    ``{"standards": (), "fit": ("standards",), ...}``. Every stage starts
+    dirty. ``recompute_counts`` records how often each stage actually ran and
+    ``durations`` how long its most recent computation took, in seconds.
+    """
+
+    def __init__(self, dependencies):
+        self.dependencies = {stage: tuple(upstream) for stage, upstream in dependencies.items()}
+        self.dirty = set(self.dependencies)
+        self.recompute_counts = dict.fromkeys(self.dependencies, 0)
+        self.durations = {}
+        self._fingerprints = {}
+        self._results = {}
+
+    def downstream(self, stage):
+        """All stages that depend on ``stage``, directly or indirectly."""
+        found = set()
+        pending = [stage]
+        while pending:
+            current = pending.pop()
+            for other, upstream in self.dependencies.items():
+                if current in upstream and other not in found:
+                    found.add(other)
+                    pending.append(other)
+        return found
+
+    def run(self, stage, inputs, compute):
+        """Result of ``compute()`` for ``stage``, reused while it is clean.
+
+        ``inputs`` is a tuple of the values the stage reads other than the
+        results of its upstream stages.
+        """
+        if stage not in self.dependencies:
+            raise KeyError(f"Unknown pipeline stage {stage!r}.")
+        key = fingerprint(*inputs)
+        if stage not in self.dirty and self._fingerprints.get(stage) == key:
+            return self._results[stage]
+        start = time.perf_counter()
+        result = compute()
+        self.durations[stage] = time.perf_counter() - start
+        self._results[stage] = result
+        self._fingerprints[stage] = key
+        self.dirty.discard(stage)
+        self.dirty.update(self.downstream(stage))
+        self.recompute_counts[stage] += 1
+        return result
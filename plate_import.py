@@ -0,0 +1,145 @@
+"""Bulk import of plate-reader exports for unknown samples.
+
+Reads a 96/384-well absorbance export and a plate map of dilution factors
+(CSV or XLSX, either as a ``Well``/value table or as a plate-shaped grid with
+row letters down the side and column numbers across the top) and
+back-calculates every well against a :class:`standard_curve.StandardCurve`
+in one vectorized pass.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+WELL_PATTERN = re.compile(r"^\s*([A-Pa-p])\s*0*(\d{1,2})\s*$")
+
+ABSORBANCE_COLUMN = "Absorbance (510 nm)"
+DILUTION_COLUMN = "Dilution Factor"
+
+
+def read_table(source, name=None):
+    """Read a CSV or Excel file (path or file-like) into a DataFrame.
+
+    The format is picked from ``name`` (or the path / ``source.name``);
+    Excel files need the optional ``openpyxl`` dependency.
+    """
+    name = str(name or getattr(source, "name", source))
+    if name.lower().endswith((".xlsx", ".xlsm", ".xls")):
+        return pd.read_excel(source)
+    return pd.read_csv(source)
+
+
+def normalize_well(well):
+    """``"a01"`` -> ``"A1"``; raises ``ValueError`` for anything that isn't a well."""
+    match = WELL_PATTERN.match(str(well))
+    if match is None or not 1 <= int(match.group(2)) <= 24:
+        raise ValueError(f"Not a plate well: {well!r}")
+    return f"{match.group(1).upper()}{int(match.group(2))}"
+
+
+def _is_grid(table):
+    first_col = table.iloc[:, 0].astype(str).str.strip()
+    headers = [str(c).strip() for c in table.columns[1:]]
+    return (
+        len(headers) > 0
+        and first_col.str.fullmatch(r"[A-Pa-p]").all()
+        and all(h.isdigit() for h in headers)
+    )
+
+
+def find_column(table, value_name, *keywords):
+    """Column whose name has a word starting with one of ``keywords``, or ``None``.
+
+    Raises ``ValueError`` when several columns match rather than guess.
+    """
+    # Keywords match at the start of a word ("abs" in "Absorbance 510",
+    # "od" in "OD600"), never inside one ("Sample Code", "Period").
+    pattern = re.compile("|".join(rf"(?<![a-z]){re.escape(k)}" for k in keywords))
+    matches = [column for column in table.columns if pattern.search(str(column).lower())]
+    if len(matches) > 1:
+        raise ValueError(f"Several columns could hold {value_name!r}: {matches}; rename or remove the extra ones.")
+    return matches[0] if matches else None
+
+
+def to_well_values(table, value_name, keywords=()):
+    """Convert a plate export to a two-column ``Well``/``value_name`` frame.
+
+    Accepts either a plate-shaped grid or a long table with a ``Well`` column;
+    in the long form the value column is the one whose name has a word
+    starting with one of ``keywords``, or else the only numeric column.
+    Raises ``ValueError`` rather than guess when that is ambiguous.
+    """
+    table = table.dropna(how="all").dropna(axis=1, how="all")
+    if _is_grid(table):
+        row_col = table.columns[0]
+        long = table.melt(id_vars=row_col, var_name="column", value_name=value_name)
+        wells = long[row_col].astype(str).str.strip() + long["column"].astype(str).str.strip()
+    else:
+        well_col = find_column(table, "Well", "well")
+        if well_col is None:
+            raise ValueError("Expected a 'Well' column or a plate-shaped grid (A, B, ... by 1, 2, ...).")
+        value_col = find_column(table.drop(columns=well_col), value_name, *keywords)
+        if value_col is None:
+            numeric = table.drop(columns=well_col).select_dtypes("number").columns
+            if len(numeric) == 0:
+                raise ValueError(f"No numeric column found for {value_name!r}.")
+            if len(numeric) > 1:
+                raise ValueError(
+                    f"Can't tell which column holds {value_name!r} among {list(numeric)}; "
+                    f"name it '{value_name}'."
+                )
+            value_col = numeric[0]
+        long = table[[well_col, value_col]].rename(columns={value_col: value_name})
+        wells = long[well_col]
+
+    result = pd.DataFrame({
+        "Well": [normalize_well(w) for w in wells],
+        value_name: pd.to_numeric(long[value_name], errors="coerce").to_numpy(dtype=float),
+    })
+    if result["Well"].duplicated().any():
+        raise ValueError("The same well appears more than once.")
+    return result
+
+
+def read_plate_absorbance(source, name=None):
+    """Well -> absorbance from a plate-reader export."""
+    return to_well_values(read_table(source, name), ABSORBANCE_COLUMN, ("abs", "od"))
+
+
+def read_plate_map(source, name=None):
+    """Well -> dilution factor from a plate map."""
+    return to_well_values(read_table(source, name), DILUTION_COLUMN, ("dilution", "factor"))
+
+
+def _well_sort_key(wells):
+    rows = wells.str[0].map(ord)
+    cols = wells.str[1:].astype(int)
+    return rows * 100 + cols
+
+
+def back_calculate_plate(curve, absorbance, plate_map, decimals=2):
+    """Per-well concentrations for a plate.
+
+    ``absorbance`` and ``plate_map`` are the frames returned by
+    :func:`read_plate_absorbance` and :func:`read_plate_map`. Wells without a
+    dilution factor (blanks, standards, empty wells) are dropped.
+    """
+    wells = absorbance.merge(plate_map, on="Well", how="inner")
+    wells = wells[wells[DILUTION_COLUMN].notna()]
+    wells = wells.sort_values("Well", key=_well_sort_key, ignore_index=True)
+
+    return back_calculate_samples(curve, wells, decimals)
+
+
+def back_calculate_samples(curve, samples, decimals=2):
+    """Add diluted and original concentrations and a status to ``samples``.
+
+    ``samples`` needs the ``Absorbance (510 nm)`` and ``Dilution Factor``
+    columns; the new columns are added in place and the frame is returned.
+    """
+    abs_values = samples[ABSORBANCE_COLUMN].to_numpy(dtype=float)
+    diluted = np.round(curve.inverse_predict(abs_values), decimals)
+    samples["Diluted sample (µg/mL)"] = diluted
+    samples["Status"] = curve.range_status(abs_values)
+    samples["Original sample (µg/mL)"] = np.round(diluted * samples[DILUTION_COLUMN].to_numpy(dtype=float), 1)
+    return samples
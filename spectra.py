@@ -0,0 +1,134 @@
+"""Full-spectrum multicomponent analysis of dye mixtures.
+
+Overlapping dyes can't be separated at a single wavelength, but a whole
+absorbance spectrum (e.g. 400-700 nm in 1 nm steps) can: by Beer-Lambert it
+is a linear combination of the dyes' pure-component spectra. A
+:class:`SpectralCalibration` estimates those pure-component spectra from
+standards of known composition (classical least squares) and then unmixes
+any number of unknown spectra at once.
+
+Spectra are held as ``float32`` arrays of shape ``(wavelengths, samples)``.
+Unmixing projects all unknowns onto the components with one matrix product;
+everything after that works on ``components x samples`` arrays, so memory is
+bounded by the input spectra themselves.
+"""
+from dataclasses import dataclass
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from plate_import import read_table
+
+SPECTRUM_DTYPE = np.float32
+MAX_NONNEGATIVE_COMPONENTS = 10
+
+
+def read_spectra(source, name=None):
+    """``(wavelengths, sample_names, absorbance)`` from a spectra export.
+
+    The first column holds the wavelengths in nm and every other column one
+    sample's spectrum (CSV or Excel, see :func:`plate_import.read_table`).
+    ``absorbance`` is a ``float32`` array of shape ``(wavelengths, samples)``
+    sorted by wavelength.
+    """
+    table = read_table(source, name).dropna(how="all").dropna(axis=1, how="all")
+    if table.shape[1] < 2:
+        raise ValueError("Expected a wavelength column followed by one column per spectrum.")
+    wavelengths = pd.to_numeric(table.iloc[:, 0], errors="coerce").to_numpy(dtype=float)
+    keep = ~np.isnan(wavelengths)
+    absorbance = table.iloc[keep, 1:].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=SPECTRUM_DTYPE)
+    if np.isnan(absorbance).any():
+        raise ValueError("Spectra contain missing or non-numeric readings.")
+    order = np.argsort(wavelengths[keep], kind="stable")
+    return wavelengths[keep][order], [str(c) for c in table.columns[1:]], absorbance[order]
+
+
+def common_wavelengths(wavelengths_a, spectra_a, wavelengths_b, spectra_b):
+    """Restrict two sets of spectra to the wavelengths they share."""
+    shared, index_a, index_b = np.intersect1d(wavelengths_a, wavelengths_b, return_indices=True)
+    if len(shared) == 0:
+        raise ValueError("The spectra have no wavelengths in common.")
+    return shared, spectra_a[index_a], spectra_b[index_b]
+
+
+@dataclass(frozen=True)
+class SpectralCalibration:
+    """Pure-component spectra of ``analytes`` at ``wavelengths``.
+
+    ``components`` has shape ``(wavelengths, analytes)``: the absorbance of
+    1 µg/mL of each analyte.
+    """
+
+    wavelengths: np.ndarray
+    components: np.ndarray
+    analytes: tuple
+
+    @classmethod
+    def fit(cls, wavelengths, standard_spectra, concentrations, analytes):
+        """Classical least-squares estimate from standards of known composition.
+
+        ``standard_spectra`` is ``(wavelengths, standards)`` and
+        ``concentrations`` ``(standards, analytes)``; single-dye dilution
+        series and mixed standards can be combined freely, as long as the
+        concentration matrix has full column rank.
+        """
+        concentrations = np.asarray(concentrations, dtype=float)
+        spectra = np.asarray(standard_spectra, dtype=float)
+        if concentrations.shape[0] != spectra.shape[1]:
+            raise ValueError("Need one row of concentrations per standard spectrum.")
+        if np.isnan(concentrations).any():
+            raise ValueError("Every standard needs a concentration for every analyte (0 if absent).")
+        if np.linalg.matrix_rank(concentrations) < concentrations.shape[1]:
+            raise ValueError("The standards don't vary each analyte independently; add single-dye standards.")
+        components, *_ = np.linalg.lstsq(concentrations, spectra.T, rcond=None)
+        return cls(
+            wavelengths=np.asarray(wavelengths, dtype=float),
+            components=components.T.astype(SPECTRUM_DTYPE),
+            analytes=tuple(analytes),
+        )
+
+    def unmix(self, spectra, nonnegative=True):
+        """Concentrations of every analyte in every spectrum.
+
+        ``spectra`` is ``(wavelengths, samples)`` on this calibration's
+        wavelengths. Returns ``(concentrations, residual_rms)`` with shapes
+        ``(analytes, samples)`` and ``(samples,)``.
+
+        All samples share one projection ``components.T @ spectra``; the
+        least-squares problem is then solved on the small normal equations.
+        With ``nonnegative`` every subset of active components is tried at
+        once for all samples (exact NNLS, fine for a handful of dyes) and
+        each sample keeps the best subset with no negative concentration.
+        """
+        spectra = np.asarray(spectra, dtype=SPECTRUM_DTYPE)
+        components = self.components.astype(np.float64)
+        gram = components.T @ components
+        projected = (self.components.T @ spectra).astype(np.float64)
+        total = np.einsum("ij,ij->j", spectra, spectra, dtype=np.float64)
+        n_analytes, n_samples = projected.shape
+
+        if not nonnegative:
+            concentrations = np.linalg.solve(gram, projected)
+            residual_ss = total - np.einsum("ij,ij->j", concentrations, projected)
+        else:
+            if n_analytes > MAX_NONNEGATIVE_COMPONENTS:
+                raise ValueError(f"Non-negative unmixing supports up to {MAX_NONNEGATIVE_COMPONENTS} analytes.")
+            concentrations = np.zeros((n_analytes, n_samples))
+            residual_ss = total.copy()
+            for size in range(1, n_analytes + 1):
+                for active in combinations(range(n_analytes), size):
+                    active = list(active)
+                    try:
+                        candidate = np.linalg.solve(gram[np.ix_(active, active)], projected[active])
+                    except np.linalg.LinAlgError:
+                        continue
+                    candidate_ss = total - np.einsum("ij,ij->j", candidate, projected[active])
+                    better = (candidate >= 0).all(axis=0) & (candidate_ss < residual_ss)
+                    concentrations[np.ix_(active, better)] = candidate[:, better]
+                    inactive = np.setdiff1d(np.arange(n_analytes), active)
+                    concentrations[np.ix_(inactive, better)] = 0.0
+                    residual_ss = np.where(better, candidate_ss, residual_ss)
+
+        residual_rms = np.sqrt(np.maximum(residual_ss, 0.0) / len(self.wavelengths))
+        return concentrations, residual_rms
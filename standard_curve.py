@@ -0,0 +1,603 @@
+"""Standard-curve fitting engine.
+
+Pure NumPy with no Streamlit imports, so the maths behind
+``standardcurve1.py`` can be run headless (batch jobs, benchmarks) and
+profiled independently of the UI. The t quantiles for the prediction
+intervals are computed in pure Python, so SciPy is not needed.
+"""
+import math
+from dataclasses import dataclass
+from statistics import NormalDist
+
+import numpy as np
+
+STATUS_MISSING = "—"
+STATUS_TOO_DILUTE = "Too dilute — below linear range"
+STATUS_TOO_CONCENTRATED = "Too concentrated — above linear range"
+STATUS_USABLE = "In linear range — usable"
+
+WEIGHTING_NONE = "none"
+WEIGHTING_INV_X = "1/x"
+WEIGHTING_INV_X2 = "1/x²"
+WEIGHTING_INV_VARIANCE = "1/σ²"
+WEIGHTING_SCHEMES = (WEIGHTING_NONE, WEIGHTING_INV_X, WEIGHTING_INV_X2, WEIGHTING_INV_VARIANCE)
+
+
+def linear_range_mask(x_all, start_conc, end_conc):
+    """Boolean mask of the standards inside ``[start_conc, end_conc]``."""
+    x_all = np.asarray(x_all, dtype=float)
+    return (x_all >= start_conc) & (x_all <= end_conc)
+
+
+def fit_weights(weighting, x, sd=None):
+    """Per-standard weights for one of :data:`WEIGHTING_SCHEMES`.
+
+    ``sd`` (the replicate SD of each standard) is required for ``"1/σ²"``.
+    Where a weight can't be formed (zero concentration for 1/x and 1/x², a
+    zero or missing SD for 1/σ²) it is NaN, and fits leave that standard out.
+    """
+    x = np.asarray(x, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if weighting == WEIGHTING_NONE:
+            weights = np.ones_like(x)
+        elif weighting == WEIGHTING_INV_X:
+            weights = 1.0 / x
+        elif weighting == WEIGHTING_INV_X2:
+            weights = 1.0 / (x * x)
+        elif weighting == WEIGHTING_INV_VARIANCE:
+            if sd is None:
+                raise ValueError("1/σ² weighting needs replicate standard deviations.")
+            sd = np.asarray(sd, dtype=float)
+            weights = 1.0 / (sd * sd)
+        else:
+            raise ValueError(f"Unknown weighting {weighting!r}; expected one of {WEIGHTING_SCHEMES}.")
+    weights[~np.isfinite(weights) | (weights <= 0)] = np.nan
+    return weights
+
+
+def _t_cdf(t, df):
+    # Closed-form CDF of Student's t for integer df (Abramowitz & Stegun 26.7.3/4).
+    theta = math.atan(t / math.sqrt(df))
+    cos2 = math.cos(theta) ** 2
+    if df % 2:
+        term, total = 1.0, 1.0 if df > 1 else 0.0
+        for k in range(1, (df - 1) // 2):
+            term *= cos2 * 2 * k / (2 * k + 1)
+            total += term
+        mass = 2 / math.pi * (theta + math.sin(theta) * math.cos(theta) * total)
+    else:
+        term = total = 1.0
+        for k in range(1, df // 2):
+            term *= cos2 * (2 * k - 1) / (2 * k)
+            total += term
+        mass = math.sin(theta) * total
+    return 0.5 + mass / 2
+
+
+def t_quantile(p, df):
+    """Quantile ``p`` of Student's t with ``df`` (integer) degrees of freedom.
+
+    Pure Python so the app does not have to import SciPy for it. Starts from
+    the Cornish-Fisher expansion around the normal quantile (accurate to
+    better than 1e-9 from df = 200, but only to a few parts in 1e6 at
+    df = 30) and, for smaller df, polishes it with Newton steps on the exact
+    CDF.
+    """
+    if df == 1:
+        return math.tan(math.pi * (p - 0.5))
+    if df == 2:
+        return (2 * p - 1) / math.sqrt(2 * p * (1 - p))
+    z = NormalDist().inv_cdf(p)
+    v = df
+    t = (
+        z
+        + (z ** 3 + z) / (4 * v)
+        + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * v ** 2)
+        + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * v ** 3)
+        + (79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3 - 945 * z) / (92160 * v ** 4)
+    )
+    if df >= 200:
+        return t
+    log_norm = math.lgamma((df + 1) / 2) - math.lgamma(df / 2) - 0.5 * math.log(df * math.pi)
+    for _ in range(4):
+        density = math.exp(log_norm - (df + 1) / 2 * math.log1p(t * t / df))
+        t -= (_t_cdf(t, df) - p) / density
+    return t
+
+
+def _centred_sums(x, y, weights):
+    sum_w = weights.sum()
+    x_mean = weights @ x / sum_w
+    y_mean = weights @ y / sum_w
+    dx = x - x_mean
+    dy = y - y_mean
+    wdx = weights * dx
+    return sum_w, x_mean, y_mean, wdx @ dx, weights @ (dy * dy), wdx @ dy
+
+
+def _line_from_centred_sums(n, sum_w, x_mean, y_mean, sxx, syy, sxy):
+    if sxx <= 0:
+        raise ValueError("Cannot fit a line when all concentrations are identical.")
+    slope = sxy / sxx
+    intercept = y_mean - slope * x_mean
+    r_value = 0.0 if syy <= 0 else float(np.clip(sxy / np.sqrt(sxx * syy), -1.0, 1.0))
+    if n > 2:
+        residual_ss = max(syy - slope * sxy, 0.0)
+        stderr = np.sqrt(residual_ss / (n - 2) / sxx)
+        intercept_stderr = stderr * np.sqrt(sxx / sum_w + x_mean ** 2)
+    else:
+        stderr = intercept_stderr = 0.0
+    return float(slope), float(intercept), r_value, float(stderr), float(intercept_stderr)
+
+
+class CalibrationRangeMixin:
+    """Usable-range logic shared by calibration curves.
+
+    Subclasses provide ``predict``, ``start_conc`` and ``end_conc``, and must
+    be monotonic over ``[start_conc, end_conc]``.
+    """
+
+    @property
+    def absorbance_range(self):
+        """``(absorbance_min, absorbance_max)`` spanned by the fitted range."""
+        a_start = float(self.predict(self.start_conc))
+        a_end = float(self.predict(self.end_conc))
+        return min(a_start, a_end), max(a_start, a_end)
+
+    def range_status(self, absorbance):
+        """Usability label for each absorbance reading (scalar or array).
+
+        Vectorized with ``np.select`` so whole plate exports are labelled in
+        one pass; a scalar input returns a plain ``str``.
+        """
+        absorbance = np.asarray(absorbance, dtype=float)
+        absorbance_min, absorbance_max = self.absorbance_range
+        status = np.select(
+            [np.isnan(absorbance), absorbance < absorbance_min, absorbance > absorbance_max],
+            [STATUS_MISSING, STATUS_TOO_DILUTE, STATUS_TOO_CONCENTRATED],
+            default=STATUS_USABLE,
+        ).astype(object)
+        return status if status.ndim else str(status)
+
+
+@dataclass(frozen=True)
+class StandardCurve(CalibrationRangeMixin):
+    """Straight-line calibration ``A = slope * C + intercept``.
+
+    ``start_conc``/``end_conc`` are the bounds of the range the line was
+    fitted on; they define the usable absorbance range for unknowns.
+    ``x_mean``, ``sxx`` and ``sum_w`` (the weighted mean concentration, the
+    centred sum of squares of x and the total weight) are kept for the
+    inverse-prediction interval.
+    """
+
+    slope: float
+    intercept: float
+    r_value: float
+    start_conc: float
+    end_conc: float
+    stderr: float = 0.0
+    intercept_stderr: float = 0.0
+    n: int = 0
+    weighting: str = WEIGHTING_NONE
+    x_mean: float = math.nan
+    sxx: float = math.nan
+    sum_w: float = math.nan
+
+    model = "linear"
+
+    @classmethod
+    def fit(cls, x, y, start_conc=None, end_conc=None, weighting=WEIGHTING_NONE, sd=None):
+        """Least-squares fit through the standards ``(x, y)``.
+
+        ``x``/``y`` should already be restricted to the linear range (see
+        :func:`linear_range_mask`); pairs with a NaN, or without a usable
+        weight (see :func:`fit_weights`), are skipped. The range bounds
+        default to the extremes of ``x``.
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        weights = fit_weights(weighting, x, sd)
+        keep = ~(np.isnan(x) | np.isnan(y) | np.isnan(weights))
+        x = x[keep]
+        y = y[keep]
+        if len(x) < 2:
+            raise ValueError("At least two standards are needed to fit a line.")
+        sums = _centred_sums(x, y, weights[keep])
+        slope, intercept, r_value, stderr, intercept_stderr = _line_from_centred_sums(len(x), *sums)
+        return cls(
+            slope=slope,
+            intercept=intercept,
+            r_value=r_value,
+            start_conc=float(x.min() if start_conc is None else start_conc),
+            end_conc=float(x.max() if end_conc is None else end_conc),
+            stderr=stderr,
+            intercept_stderr=intercept_stderr,
+            n=len(x),
+            weighting=weighting,
+            x_mean=float(sums[1]),
+            sxx=float(sums[3]),
+            sum_w=float(sums[0]),
+        )
+
+    @classmethod
+    def fit_many(cls, x, y, start_conc=None, end_conc=None, weighting=WEIGHTING_NONE):
+        """Fit one line per row of the 2-D arrays ``x`` and ``y`` in one pass.
+
+        Each row holds one analyte's standards, padded with NaN to a common
+        length. ``start_conc``/``end_conc`` (scalars or one value per row; NaN
+        or None for no limit) restrict each row to its linear range, as
+        :func:`linear_range_mask` does for :meth:`fit`. All sums are taken
+        along the rows at once; the result is a list with one curve per row,
+        or ``None`` where fewer than two distinct concentrations remain.
+        """
+        x = np.atleast_2d(np.asarray(x, dtype=float))
+        y = np.atleast_2d(np.asarray(y, dtype=float))
+        rows = x.shape[0]
+        start = np.broadcast_to(np.asarray(np.nan if start_conc is None else start_conc, dtype=float), (rows,))
+        end = np.broadcast_to(np.asarray(np.nan if end_conc is None else end_conc, dtype=float), (rows,))
+        weights = fit_weights(weighting, x)
+        keep = (
+            ~(np.isnan(x) | np.isnan(y) | np.isnan(weights))
+            & ~(x < start[:, None])
+            & ~(x > end[:, None])
+        )
+        w = np.where(keep, weights, 0.0)
+        n = keep.sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sum_w = w.sum(axis=1)
+            x_mean = (w * np.where(keep, x, 0.0)).sum(axis=1) / sum_w
+            y_mean = (w * np.where(keep, y, 0.0)).sum(axis=1) / sum_w
+            dx = np.where(keep, x - x_mean[:, None], 0.0)
+            dy = np.where(keep, y - y_mean[:, None], 0.0)
+            sxx = (w * dx * dx).sum(axis=1)
+            syy = (w * dy * dy).sum(axis=1)
+            sxy = (w * dx * dy).sum(axis=1)
+            slope = sxy / sxx
+            intercept = y_mean - slope * x_mean
+            r_value = np.where(syy > 0, np.clip(sxy / np.sqrt(sxx * syy), -1.0, 1.0), 0.0)
+            residual_ss = np.maximum(syy - slope * sxy, 0.0)
+            stderr = np.where(n > 2, np.sqrt(residual_ss / (n - 2) / sxx), 0.0)
+            intercept_stderr = stderr * np.sqrt(sxx / sum_w + x_mean ** 2)
+        x_min = np.where(keep, x, np.inf).min(axis=1)
+        x_max = np.where(keep, x, -np.inf).max(axis=1)
+
+        curves = []
+        for i in range(rows):
+            if n[i] < 2 or not sxx[i] > 0:
+                curves.append(None)
+                continue
+            curves.append(cls(
+                slope=float(slope[i]),
+                intercept=float(intercept[i]),
+                r_value=float(r_value[i]),
+                start_conc=float(x_min[i] if np.isnan(start[i]) else start[i]),
+                end_conc=float(x_max[i] if np.isnan(end[i]) else end[i]),
+                stderr=float(stderr[i]),
+                intercept_stderr=float(intercept_stderr[i]),
+                n=int(n[i]),
+                weighting=weighting,
+                x_mean=float(x_mean[i]),
+                sxx=float(sxx[i]),
+                sum_w=float(sum_w[i]),
+            ))
+        return curves
+
+    @property
+    def r_squared(self):
+        return self.r_value ** 2
+
+    @property
+    def equation(self):
+        return f"Absorbance = {self.slope:.5f} * Concentration + {self.intercept:.4f}"
+
+    def predict(self, conc):
+        """Absorbance expected at ``conc`` (scalar or array)."""
+        return self.slope * np.asarray(conc, dtype=float) + self.intercept
+
+    def inverse_predict(self, absorbance):
+        """Concentration that gives ``absorbance`` (scalar or array); NaN stays NaN."""
+        return (np.asarray(absorbance, dtype=float) - self.intercept) / self.slope
+
+    @property
+    def residual_se(self):
+        """Residual standard error of the fit (weighted for weighted fits)."""
+        return self.stderr * math.sqrt(self.sxx)
+
+    def inverse_prediction_interval(self, absorbance, level=0.95, n_readings=1):
+        """Closed-form calibration interval for concentrations read off the line.
+
+        For each absorbance (the mean of ``n_readings`` readings)::
+
+            x0 ± t * (s / |m|) * sqrt(1/(k w̄) + 1/Σw + (y0 - ȳ)² / (m² Sxx))
+
+        with ``w̄`` the mean weight (1 for an unweighted fit, giving the usual
+        ``1/k + 1/n`` terms). One vectorized pass over the whole array;
+        returns ``(lower, upper)``, NaN when the fit has no residual degrees
+        of freedom.
+        """
+        absorbance = np.asarray(absorbance, dtype=float)
+        x0 = self.inverse_predict(absorbance)
+        if self.n <= 2 or not np.isfinite(self.sxx):
+            nan = np.full(absorbance.shape, np.nan)
+            return nan, nan
+        y_mean = self.intercept + self.slope * self.x_mean
+        mean_weight = self.sum_w / self.n
+        half_width = (
+            t_quantile(0.5 + level / 2, self.n - 2)
+            * self.residual_se / abs(self.slope)
+            * np.sqrt(
+                1 / (n_readings * mean_weight)
+                + 1 / self.sum_w
+                + (absorbance - y_mean) ** 2 / (self.slope ** 2 * self.sxx)
+            )
+        )
+        return x0 - half_width, x0 + half_width
+
+
+def _bootstrap_chunk(x, y, weights, n_resamples, seed):
+    rng = np.random.default_rng(seed)
+    idx = rng.integers(0, len(x), size=(n_resamples, len(x)))
+    xb = x[idx]
+    yb = y[idx]
+    wb = weights[idx]
+    sum_w = wb.sum(axis=1)
+    x_mean = np.einsum("ij,ij->i", wb, xb) / sum_w
+    y_mean = np.einsum("ij,ij->i", wb, yb) / sum_w
+    dx = xb - x_mean[:, None]
+    dy = yb - y_mean[:, None]
+    sxx = np.einsum("ij,ij,ij->i", wb, dx, dx)
+    sxy = np.einsum("ij,ij,ij->i", wb, dx, dy)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slopes = np.where(sxx > 0, sxy / sxx, np.nan)
+    return slopes, y_mean - slopes * x_mean
+
+
+def bootstrap_line_params(x, y, weights=None, n_boot=2000, seed=0, workers=None, chunk_size=500):
+    """Slopes and intercepts refitted on ``n_boot`` resamples of the standards.
+
+    Each chunk of resamples is one batched computation: a ``(chunk, n)``
+    matrix of resample indices gathers the standards and every line is solved
+    at once from row-wise sums. Chunks run on a thread pool of ``workers``
+    threads when given (NumPy releases the GIL for the heavy array work).
+    Results depend only on ``seed``, not on ``workers``. Resamples that hit a
+    single concentration give NaN.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    weights = np.ones_like(x) if weights is None else np.asarray(weights, dtype=float)
+    sizes = [min(chunk_size, n_boot - start) for start in range(0, n_boot, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(x, y, weights, size, chunk_seed) for size, chunk_seed in zip(sizes, seeds)]
+
+    if workers is None or workers <= 1 or len(tasks) == 1:
+        results = [_bootstrap_chunk(*task) for task in tasks]
+    else:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(lambda task: _bootstrap_chunk(*task), tasks))
+    slopes = np.concatenate([r[0] for r in results])
+    intercepts = np.concatenate([r[1] for r in results])
+    return slopes, intercepts
+
+
+def bootstrap_inverse_ci(slopes, intercepts, absorbance, level=0.95):
+    """Percentile interval of the back-calculated concentration.
+
+    ``slopes``/``intercepts`` come from :func:`bootstrap_line_params`;
+    ``absorbance`` may be a scalar or an array. Returns ``(lower, upper)``
+    with the same shape as ``absorbance``.
+    """
+    absorbance = np.asarray(absorbance, dtype=float)
+    valid = ~np.isnan(slopes)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        concs = (absorbance[..., None] - intercepts[valid]) / slopes[valid]
+    tail = (1 - level) / 2 * 100
+    lower, upper = np.percentile(concs, [tail, 100 - tail], axis=-1)
+    return lower, upper
+
+
+def aggregate_replicates(x, y):
+    """Group replicate readings by concentration.
+
+    Returns ``(concs, means, sds, counts)`` over the sorted unique
+    concentrations, computed with ``np.unique``/``np.bincount`` so it stays a
+    few array passes however many replicates there are. NaN readings are
+    ignored; ``sds`` (sample SD, ``ddof=1``) is NaN where fewer than two
+    readings exist and ``means`` is NaN where there are none.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    keep = ~np.isnan(x)
+    x = x[keep]
+    y = y[keep]
+    concs, group = np.unique(x, return_inverse=True)
+    valid = ~np.isnan(y)
+    counts = np.bincount(group, weights=valid, minlength=len(concs))
+    y_valid = np.where(valid, y, 0.0)
+    sums = np.bincount(group, weights=y_valid, minlength=len(concs))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = sums / counts
+        deviations = np.where(valid, y_valid - means[group], 0.0)
+        sds = np.sqrt(np.bincount(group, weights=deviations ** 2, minlength=len(concs)) / (counts - 1))
+    sds[counts < 2] = np.nan
+    return concs, means, sds, counts.astype(int)
+
+
+@dataclass
+class SufficientStats:
+    """Running sums (n, Σw, Σwx, Σwy, Σwx², Σwxy, Σwy²) that determine a line fit.
+
+    Adding, removing or replacing a standard is O(1), so a single edited
+    absorbance updates the fit without revisiting the other standards.
+    Weights default to 1 (ordinary least squares); points with a NaN
+    coordinate or weight are ignored.
+    """
+
+    n: int = 0
+    sum_w: float = 0.0
+    sum_x: float = 0.0
+    sum_y: float = 0.0
+    sum_xx: float = 0.0
+    sum_xy: float = 0.0
+    sum_yy: float = 0.0
+
+    @classmethod
+    def from_points(cls, x, y, weights=None):
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        weights = np.ones_like(x) if weights is None else np.asarray(weights, dtype=float)
+        keep = ~(np.isnan(x) | np.isnan(y) | np.isnan(weights))
+        x = x[keep]
+        y = y[keep]
+        weights = weights[keep]
+        wx = weights * x
+        wy = weights * y
+        return cls(
+            n=len(x),
+            sum_w=float(weights.sum()),
+            sum_x=float(wx.sum()),
+            sum_y=float(wy.sum()),
+            sum_xx=float(wx @ x),
+            sum_xy=float(wx @ y),
+            sum_yy=float(wy @ y),
+        )
+
+    def add(self, x, y, weight=1.0, count=1):
+        if np.isnan(x) or np.isnan(y) or np.isnan(weight):
+            return
+        w = count * weight
+        self.n += count
+        self.sum_w += w
+        self.sum_x += w * x
+        self.sum_y += w * y
+        self.sum_xx += w * x * x
+        self.sum_xy += w * x * y
+        self.sum_yy += w * y * y
+
+    def remove(self, x, y, weight=1.0):
+        self.add(x, y, weight, count=-1)
+
+    def replace(self, old, new):
+        """Swap point ``old`` for ``new``, each an ``(x, y, weight)`` tuple."""
+        self.remove(*old)
+        self.add(*new)
+
+    def fit(self, start_conc, end_conc, weighting=WEIGHTING_NONE):
+        """:class:`StandardCurve` for the current sums."""
+        if self.n < 2:
+            raise ValueError("At least two standards are needed to fit a line.")
+        x_mean = self.sum_x / self.sum_w
+        y_mean = self.sum_y / self.sum_w
+        slope, intercept, r_value, stderr, intercept_stderr = _line_from_centred_sums(
+            self.n,
+            self.sum_w,
+            x_mean,
+            y_mean,
+            self.sum_xx - self.sum_w * x_mean * x_mean,
+            self.sum_yy - self.sum_w * y_mean * y_mean,
+            self.sum_xy - self.sum_w * x_mean * y_mean,
+        )
+        return StandardCurve(
+            slope=slope,
+            intercept=intercept,
+            r_value=r_value,
+            start_conc=float(start_conc),
+            end_conc=float(end_conc),
+            stderr=stderr,
+            intercept_stderr=intercept_stderr,
+            n=self.n,
+            weighting=weighting,
+            x_mean=x_mean,
+            sxx=self.sum_xx - self.sum_w * x_mean * x_mean,
+            sum_w=self.sum_w,
+        )
+
+
+@dataclass(frozen=True)
+class LinearRangeWindow:
+    """A contiguous concentration window proposed by :func:`detect_linear_range`.
+
+    ``n`` counts the readings in the window and ``n_standards`` its distinct
+    concentrations; they differ when standards were read in replicate.
+    """
+
+    start_conc: float
+    end_conc: float
+    r_squared: float
+    residual_se: float
+    n: int
+    n_standards: int
+
+
+def detect_linear_range(x, y, min_r_squared=0.99, max_residual_se=None, min_points=3):
+    """Widest contiguous concentration window that is acceptably linear.
+
+    Every window ``[concs[i], concs[j]]`` over the sorted unique
+    concentrations is scored from prefix sums of x, y, x², xy and y², so all
+    O(n²) windows are evaluated in a few vectorized passes instead of refitting
+    each one. A window qualifies if it spans at least ``min_points`` distinct
+    concentrations (replicates don't count twice), reaches ``min_r_squared``
+    and, when given, has a residual standard error of at most
+    ``max_residual_se``. Ties in width go to the higher R².
+    Returns a :class:`LinearRangeWindow`, or ``None`` if nothing qualifies.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    keep = ~(np.isnan(x) | np.isnan(y))
+    order = np.argsort(x[keep], kind="stable")
+    x = x[keep][order]
+    y = y[keep][order]
+    concs, first = np.unique(x, return_index=True)
+    if len(concs) < 2:
+        return None
+
+    # Centring first keeps the sums-of-squares differences well conditioned.
+    xc = x - x.mean()
+    yc = y - y.mean()
+    zero = np.zeros(1)
+    sum_x, sum_y, sum_xx, sum_xy, sum_yy = (
+        np.concatenate((zero, np.cumsum(v))) for v in (xc, yc, xc * xc, xc * yc, yc * yc)
+    )
+
+    i, j = np.triu_indices(len(concs), k=1)
+    lo = first[i]
+    hi = np.append(first[1:], len(x))[j]
+    n = hi - lo
+    sx = sum_x[hi] - sum_x[lo]
+    sy = sum_y[hi] - sum_y[lo]
+    sxx = (sum_xx[hi] - sum_xx[lo]) - sx * sx / n
+    syy = (sum_yy[hi] - sum_yy[lo]) - sy * sy / n
+    sxy = (sum_xy[hi] - sum_xy[lo]) - sx * sy / n
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r_squared = np.where(syy > 0, sxy * sxy / (sxx * syy), 0.0)
+        residual_ss = np.maximum(syy - sxy * sxy / sxx, 0.0)
+        residual_se = np.where(n > 2, np.sqrt(residual_ss / (n - 2)), 0.0)
+
+    ok = (j - i + 1 >= min_points) & (r_squared >= min_r_squared)
+    if max_residual_se is not None:
+        ok &= residual_se <= max_residual_se
+    candidates = np.flatnonzero(ok)
+    if len(candidates) == 0:
+        return None
+    best = candidates[np.lexsort((-r_squared[candidates], -(j - i)[candidates]))[0]]
+    return LinearRangeWindow(
+        start_conc=float(concs[i[best]]),
+        end_conc=float(concs[j[best]]),
+        r_squared=float(r_squared[best]),
+        residual_se=float(residual_se[best]),
+        n=int(n[best]),
+        n_standards=int(j[best] - i[best] + 1),
+    )
+
+
+def spread_percent(values):
+    """Max-min spread of ``values`` as a percentage of their midpoint."""
+    values = np.asarray(values, dtype=float)
+    max_val = values.max()
+    min_val = values.min()
+    if max_val + min_val <= 0:
+        return 0
+    return (max_val - min_val) / ((max_val + min_val) / 2) * 100
@@ -1,12 +1,111 @@
+import base64
+import io
+import mimetypes
+import os
+import uuid
+from pathlib import Path
+
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.stats import linregress
+
+from calibration_models import (
+    CALIBRATION_MODELS,
+    MIN_POINTS,
+    MODEL_4PL,
+    MODEL_5PL,
+    MODEL_LINEAR,
+    MODEL_QUADRATIC,
+    fit_calibration,
+)
+from instrumentation import TIMING_LOG_ENV, SectionTimer, enable_json_logs
+from pipeline import Pipeline, fingerprint
+from plate_import import back_calculate_plate, read_plate_absorbance, read_plate_map
+from spectra import SpectralCalibration, common_wavelengths, read_spectra
+from submissions import INSTRUCTOR_PASSWORD_ENV, SUBMISSIONS_DB_ENV, ClassSummary, SubmissionStore
+from standard_curve import (
+    STATUS_USABLE,
+    StandardCurve,
+    WEIGHTING_INV_VARIANCE,
+    WEIGHTING_INV_X,
+    WEIGHTING_INV_X2,
+    WEIGHTING_NONE,
+    WEIGHTING_SCHEMES,
+    SufficientStats,
+    aggregate_replicates,
+    bootstrap_inverse_ci,
+    bootstrap_line_params,
+    detect_linear_range,
+    fit_weights,
+    linear_range_mask,
+    spread_percent,
+)
 
 # --- CONFIG ---
 st.set_page_config(page_title="Standard Curve Tutorial", layout="wide")
 
+# --- INSTRUMENTATION ---
+# Section timings for this rerun; shown with ?timing=1 and logged as JSON
+# when STANDARD_CURVE_TIMING_LOG is set (see instrumentation.py).
+timings = SectionTimer()
+show_timings = st.query_params.get("timing") == "1"
+log_timings = bool(os.environ.get(TIMING_LOG_ENV))
+
+# --- PIPELINE STATE ---
+# Each stage's result is kept in session state and reused on reruns until the
+# widgets it reads change or a stage it depends on is recomputed.
+PIPELINE_STAGES = {
+    "standards": (),
+    "fit": ("standards",),
+    "plot": ("fit",),
+    "unknowns": ("fit",),
+    "back_calc": ("unknowns",),
+    "export": ("back_calc",),
+}
+pipeline = st.session_state.setdefault("pipeline", Pipeline(PIPELINE_STAGES))
+counts_at_start = dict(pipeline.recompute_counts)
+
+
+# --- TIMING PANEL ---
+def report_timings():
+    # Called once per rerun: at the end of the script, or from stop_rerun().
+    if not (show_timings or log_timings):
+        return
+    recomputed = [stage for stage, count in pipeline.recompute_counts.items() if count > counts_at_start[stage]]
+    if log_timings:
+        enable_json_logs()
+        session_id = st.session_state.setdefault("timing_session_id", uuid.uuid4().hex)
+        timings.log(session=session_id, recomputed=recomputed, recompute_counts=dict(pipeline.recompute_counts))
+    if show_timings:
+        timing_record = timings.record()
+        with st.sidebar:
+            st.subheader("Rerun timings")
+            st.caption(f"Script run: {timing_record['total_ms']:.1f} ms")
+            st.dataframe(
+                pd.DataFrame({
+                    "Section": list(timing_record["sections_ms"]),
+                    "ms": np.round(list(timing_record["sections_ms"].values()), 1),
+                }),
+                hide_index=True,
+                width="stretch"
+            )
+            st.dataframe(
+                pd.DataFrame({
+                    "Stage": list(pipeline.recompute_counts),
+                    "Recomputed this run": [stage in recomputed for stage in pipeline.recompute_counts],
+                    "Recomputations": list(pipeline.recompute_counts.values()),
+                }),
+                hide_index=True,
+                width="stretch"
+            )
+
+
+def stop_rerun():
+    # Nothing can be drawn once st.stop() is called, so the timings go first.
+    report_timings()
+    st.stop()
+
+
 # --- STYLING ---
 st.markdown("""
 <style>
@@ -32,21 +131,128 @@ h2, h3 {
 """, unsafe_allow_html=True)
 
 # --- DEPARTMENT BANNER ---
-import base64
-with open("CBEN.png", "rb") as _banner_file:
-    _banner_b64 = base64.b64encode(_banner_file.read()).decode()
-st.markdown(
-    f"""
-    <div style="background-color: #000000; padding: 0.5rem 1.5rem; margin-bottom: 1rem; border-radius: 4px;">
-        <img src="data:image/png;base64,{_banner_b64}" style="height: 80px; display: block;" />
-    </div>
-    """,
-    unsafe_allow_html=True,
-)
+STATIC_DIR = Path(__file__).parent / "static"
+
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def _load_asset_data_uri(path, mtime):
+    # mtime is only part of the cache key: editing the file invalidates the entry.
+    mime = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    with open(path, "rb") as asset_file:
+        return f"data:{mime};base64,{base64.b64encode(asset_file.read()).decode()}"
+
+
+def static_asset_url(name):
+    """URL for a file in ./static.
+
+    Uses Streamlit's static file serving when it is enabled (see
+    .streamlit/config.toml) so the browser fetches and caches the file itself;
+    otherwise falls back to a data URI that is encoded once per file version.
+    """
+    if st.get_option("server.enableStaticServing"):
+        return f"app/static/{name}"
+    path = STATIC_DIR / name
+    return _load_asset_data_uri(str(path), path.stat().st_mtime)
+
+
+with timings.section("Banner"):
+    st.markdown(
+        f"""
+        <div style="background-color: #000000; padding: 0.5rem 1.5rem; margin-bottom: 1rem; border-radius: 4px;">
+            <img src="{static_asset_url('CBEN.png')}" style="height: 80px; display: block;" />
+        </div>
+        """,
+        unsafe_allow_html=True,
+    )
 
 # --- PAGE TITLE ---
 st.title("Standard Curve Tutorial")
 
+# --- SUBMISSIONS ---
+# Students can submit their final result; all sessions share one local SQLite
+# file, one result per student and beverage. Opening the app with
+# ?view=instructor shows the class dashboard instead of the tutorial; it stays
+# disabled until STANDARD_CURVE_INSTRUCTOR_PASSWORD is set on the server.
+SUBMISSIONS_DB = os.environ.get(SUBMISSIONS_DB_ENV, str(Path(__file__).parent / "submissions.sqlite3"))
+
+
+@st.cache_resource(show_spinner=False)
+def submission_store(path):
+    return SubmissionStore(path)
+
+
+@st.cache_resource(show_spinner=False)
+def class_summary(path):
+    # One running summary per store, shared by every instructor session and
+    # brought up to date from the rows added since its last refresh.
+    return ClassSummary()
+
+
+def render_instructor_dashboard():
+    st.header("Instructor dashboard")
+    password = os.environ.get(INSTRUCTOR_PASSWORD_ENV)
+    if not password:
+        st.error(f"The instructor dashboard is disabled. Set {INSTRUCTOR_PASSWORD_ENV} on the server to enable it.")
+        return
+    if st.text_input("Instructor password:", type="password", key="instructor_password") != password:
+        st.info("Enter the instructor password to see the class results.")
+        return
+
+    summary = class_summary(SUBMISSIONS_DB)
+    summary.refresh(submission_store(SUBMISSIONS_DB))
+    st.button("Check for new submissions", key="refresh_dashboard")
+    if summary.submissions.empty:
+        st.info("No submissions yet. Students can submit their result at the end of the tutorial.")
+        return
+
+    _, slope_mean, slope_sd = summary.class_statistics("slope")
+    _, r_squared_mean, _ = summary.class_statistics("r_squared")
+    metric_cols = st.columns(4)
+    metric_cols[0].metric("Submissions", f"{len(summary.submissions)}")
+    metric_cols[1].metric("Beverages", f"{summary.submissions['beverage'].nunique()}")
+    metric_cols[2].metric("Class slope", f"{slope_mean:.5f}", help=f"SD {slope_sd:.5f}")
+    metric_cols[3].metric("Mean R²", f"{r_squared_mean:.4f}")
+
+    st.subheader("Results by beverage")
+    st.dataframe(summary.beverage_summary().round(1), width="stretch")
+
+    import altair as alt
+
+    distribution = alt.Chart(summary.submissions).encode(
+        x=alt.X("beverage:N", title=None),
+        y=alt.Y("original_conc:Q", title="Red 40 in beverage (µg/mL)"),
+    )
+    st.altair_chart(
+        distribution.mark_boxplot(color="#CFB87C") + distribution.mark_circle(color="#000000", opacity=0.5).encode(
+            tooltip=["student", "beverage", alt.Tooltip("original_conc:Q", format=".1f"), alt.Tooltip("r_squared:Q", format=".4f")]
+        ),
+        width="stretch"
+    )
+
+    st.subheader("Submissions to check")
+    flagged = summary.flag_outliers()
+    flagged = flagged[flagged["flag"] != ""]
+    if flagged.empty:
+        st.success("No submission stands out from the class.")
+    else:
+        st.dataframe(
+            flagged[["submitted_at", "student", "beverage", "original_conc", "conc_z", "slope", "slope_z", "r_squared", "flag"]],
+            hide_index=True,
+            width="stretch"
+        )
+    st.download_button(
+        label="Download all submissions",
+        data=lambda: summary.submissions.to_csv(index=False).encode('utf-8'),
+        file_name="class_submissions.csv",
+        mime="text/csv",
+        on_click="ignore",
+        key="download_submissions"
+    )
+
+
+if st.query_params.get("view") == "instructor":
+    render_instructor_dashboard()
+    stop_rerun()
 
 # --- INTRO (collapsible) ---
 with st.expander("What is a standard curve? (Click to expand)", expanded=False):
@@ -68,236 +274,872 @@ To find an unknown concentration from an absorbance reading, rearrange the equat
 
 
 # --- STEP 1: STANDARDS DATA ---
-st.header("Step 1: Enter your standard absorbance data")
+with timings.section("Step 1: standards"):
+    st.header("Step 1: Enter your standard absorbance data")
 
-st.markdown("""
-Enter the absorbance you measured for each Red 40 standard at **510 nm**. The standard concentrations are pre-filled based on the Day 1 dilution series.
+    st.markdown("""
+Enter the absorbance you measured for each Red 40 standard at **510 nm**. The standard concentrations are pre-filled based on the Day 1 dilution series. If you read each standard more than once, set the number of replicates first and enter one reading per column.
 """)
 
-default_concs = [2000.0, 1000.0, 500.0, 250.0, 125.0, 62.5, 31.25, 15.6, 0.0]
-labels = ["ST1", "ST2", "ST3", "ST4", "ST5", "ST6", "ST7", "ST8", "Blank"]
-default_abs = [2.000, 1.450, 0.850, 0.440, 0.220, 0.110, 0.055, 0.028, 0.000]
+    n_replicates = st.number_input(
+        "Replicate readings per standard:",
+        min_value=1,
+        max_value=12,
+        value=1,
+        step=1,
+        key="n_replicates",
+        help="Changing this resets the table below."
+    )
 
-df_std = pd.DataFrame({
-    "Standard": labels,
-    "Red 40 (µg/mL)": default_concs,
-    "Absorbance (510 nm)": default_abs
-})
+    default_concs = [2000.0, 1000.0, 500.0, 250.0, 125.0, 62.5, 31.25, 15.6, 0.0]
+    labels = ["ST1", "ST2", "ST3", "ST4", "ST5", "ST6", "ST7", "ST8", "Blank"]
+    default_abs = [2.000, 1.450, 0.850, 0.440, 0.220, 0.110, 0.055, 0.028, 0.000]
 
-edited_std = st.data_editor(
-    df_std,
-    key="std_editor",
-    disabled=["Standard", "Red 40 (µg/mL)"],
-    width="stretch"
-)
+    replicate_columns = ["Absorbance (510 nm)"] + [f"Replicate {i} (510 nm)" for i in range(2, n_replicates + 1)]
+
+
+    @st.cache_resource(max_entries=16, show_spinner=False)
+    def standards_template(n_replicates):
+        # st.data_editor copies its input, so one template per replicate count
+        # can be shared instead of rebuilding it on every rerun.
+        return pd.DataFrame({
+            "Standard": labels,
+            "Red 40 (µg/mL)": default_concs,
+            "Absorbance (510 nm)": default_abs,
+            **{f"Replicate {i} (510 nm)": np.nan for i in range(2, n_replicates + 1)}
+        })
 
-x_all = edited_std["Red 40 (µg/mL)"].values.astype(float)
-y_all = edited_std["Absorbance (510 nm)"].values.astype(float)
+
+    edited_std = st.data_editor(
+        standards_template(n_replicates),
+        key="std_editor",
+        disabled=["Standard", "Red 40 (µg/mL)"],
+        width="stretch"
+    )
+
+
+    @st.cache_data(max_entries=64, ttl="2h", show_spinner=False)
+    def summarize_replicates(x_readings, y_readings):
+        return aggregate_replicates(x_readings, y_readings)
+
+
+    def process_standards():
+        # Every reading as one (concentration, absorbance) pair; row-major ravel
+        # keeps each standard's replicates next to each other.
+        x_readings = np.repeat(edited_std["Red 40 (µg/mL)"].to_numpy(dtype=float), n_replicates)
+        y_readings = edited_std[replicate_columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float).ravel()
+        if n_replicates == 1:
+            return {"readings": (x_readings, y_readings)}
+
+        rep_concs, rep_means, rep_sds, rep_counts = summarize_replicates(x_readings, y_readings)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rep_cv = np.round(rep_sds / rep_means * 100, 1)
+        readings_present = ~np.isnan(y_readings)
+        return {
+            "readings": (x_readings[readings_present], y_readings[readings_present]),
+            "means": (rep_concs, rep_means),
+            "sds": rep_sds,
+            "counts": rep_counts,
+            "summary": pd.DataFrame({
+                "Red 40 (µg/mL)": rep_concs,
+                "Readings": rep_counts,
+                "Mean absorbance": np.round(rep_means, 4),
+                "SD": np.round(rep_sds, 4),
+                "CV (%)": rep_cv,
+            }).iloc[::-1],
+        }
+
+
+    standards = pipeline.run("standards", (edited_std, n_replicates), process_standards)
+
+    fit_on = None
+    if n_replicates > 1:
+        st.dataframe(standards["summary"], hide_index=True, width="stretch")
+        fit_on = st.radio(
+            "Fit the curve on:",
+            ["Mean of each standard", "All individual readings"],
+            horizontal=True,
+            key="fit_on"
+        )
+    if fit_on == "Mean of each standard":
+        x_all, y_all = standards["means"]
+    else:
+        x_all, y_all = standards["readings"]
 
 
 # --- STEP 2: LINEAR RANGE ---
-st.header("Step 2: Identify the linear range")
+with timings.section("Step 2: linear range"):
+    st.header("Step 2: Identify the linear range")
 
-st.markdown("""
+    st.markdown("""
 Not every standard will fall on a straight line. At **very high concentrations**, the spectrophotometer saturates and absorbance readings flatten. At **very low concentrations**, readings get noisy.
 
-Adjust the sliders below to select the concentration range where your data forms the cleanest straight line.
+Adjust the sliders below to select the concentration range where your data forms the cleanest straight line, or let the app propose the widest range that meets a minimum R². If your high standards bend over, you can instead fit a curved calibration model and keep them.
 """)
 
-col_start, col_end = st.columns(2)
-unique_concs_sorted = sorted(np.unique(x_all))
-default_start_idx = min(2, len(unique_concs_sorted) - 1)
-default_end_idx = max(0, len(unique_concs_sorted) - 2)
 
-start_conc = col_start.selectbox(
-    "Start concentration for linear fit (µg/mL):",
-    options=unique_concs_sorted,
-    index=default_start_idx,
-    key="start_conc_select"
-)
-end_conc = col_end.selectbox(
-    "End concentration for linear fit (µg/mL):",
-    options=unique_concs_sorted,
-    index=len(unique_concs_sorted) - 1,
-    key="end_conc_select"
-)
+    def apply_detected_linear_range(x_all, y_all):
+        window = detect_linear_range(x_all, y_all, min_r_squared=st.session_state["auto_range_min_r2"])
+        st.session_state["auto_range_result"] = {"window": window}
+        if window is not None:
+            st.session_state["start_conc_select"] = window.start_conc
+            st.session_state["end_conc_select"] = window.end_conc
 
-if end_conc <= start_conc:
-    st.error("End concentration must be greater than start concentration.")
-    st.stop()
 
-linear_mask = (x_all >= start_conc) & (x_all <= end_conc)
-x_linear = x_all[linear_mask]
-y_linear = y_all[linear_mask]
+    col_start, col_end, col_weight, col_model = st.columns(4)
+    unique_concs_sorted = sorted(np.unique(x_all))
+    default_start_idx = min(2, len(unique_concs_sorted) - 1)
+    default_end_idx = max(0, len(unique_concs_sorted) - 2)
+    # The defaults are seeded through session state rather than index=, since
+    # auto-detect also sets these keys and Streamlit warns when both are used.
+    if st.session_state.get("start_conc_select") not in unique_concs_sorted:
+        st.session_state["start_conc_select"] = unique_concs_sorted[default_start_idx]
+    if st.session_state.get("end_conc_select") not in unique_concs_sorted:
+        st.session_state["end_conc_select"] = unique_concs_sorted[-1]
+
+    start_conc = col_start.selectbox(
+        "Start concentration for linear fit (µg/mL):",
+        options=unique_concs_sorted,
+        key="start_conc_select"
+    )
+    end_conc = col_end.selectbox(
+        "End concentration for linear fit (µg/mL):",
+        options=unique_concs_sorted,
+        key="end_conc_select"
+    )
+    weighting_labels = {
+        WEIGHTING_NONE: "None (ordinary least squares)",
+        WEIGHTING_INV_X: "1/x",
+        WEIGHTING_INV_X2: "1/x²",
+        WEIGHTING_INV_VARIANCE: "1/σ² (from replicates)",
+    }
+    weighting = col_weight.selectbox(
+        "Weighting:",
+        options=[w for w in WEIGHTING_SCHEMES if n_replicates > 1 or w != WEIGHTING_INV_VARIANCE],
+        format_func=weighting_labels.get,
+        key="weighting_select",
+        help="Absorbance noise usually grows with concentration. Weighting gives the low standards more say in the fit. Standards at zero concentration (1/x, 1/x²) or without replicate spread (1/σ²) are left out of weighted fits."
+    )
+    model_labels = {
+        MODEL_LINEAR: "Straight line",
+        MODEL_QUADRATIC: "Quadratic",
+        MODEL_4PL: "4-parameter logistic",
+        MODEL_5PL: "5-parameter logistic",
+    }
+    model = col_model.selectbox(
+        "Calibration model:",
+        options=CALIBRATION_MODELS,
+        format_func=model_labels.get,
+        key="model_select"
+    )
 
+    detect_col, threshold_col = st.columns(2)
+    threshold_col.number_input(
+        "Minimum R² for auto-detect:",
+        min_value=0.9,
+        max_value=0.9999,
+        value=0.99,
+        step=0.001,
+        format="%.4f",
+        key="auto_range_min_r2"
+    )
+    detect_col.button(
+        "Auto-detect linear range",
+        on_click=apply_detected_linear_range,
+        args=(x_all, y_all),
+        key="auto_range_button"
+    )
+    auto_range_result = st.session_state.pop("auto_range_result", None)
+    if auto_range_result is not None:
+        window = auto_range_result["window"]
+        if window is None:
+            st.warning("No range of at least three standards reaches that R². Try a lower threshold or check your standards for typos.")
+        else:
+            st.success(f"Proposed range: {window.start_conc:g} to {window.end_conc:g} µg/mL ({window.n_standards} standards, R² = {window.r_squared:.4f}).")
 
-# --- STEP 3: CURVE EQUATION ---
-if len(x_linear) >= 2:
-    slope, intercept, r_value, _, _ = linregress(x_linear, y_linear)
-    r_squared = r_value ** 2
+    if end_conc <= start_conc:
+        st.error("End concentration must be greater than start concentration.")
+        stop_rerun()
+
+
+# --- CACHED FIT ---
+# Keyed on the standards, the selected range and the fit options only, so
+# reruns triggered by the beverage name or the unknown-sample table reuse the
+# previous fit. The underscore keeps the warm-start guess out of the cache key.
+@st.cache_data(max_entries=512, ttl="2h", show_spinner=False)
+def fit_calibration_curve(x_all, y_all, start_conc, end_conc, model, weighting=WEIGHTING_NONE, sd_all=None, _initial=None):
+    mask = linear_range_mask(x_all, start_conc, end_conc)
+    sd = None if sd_all is None else sd_all[mask]
+    return fit_calibration(model, x_all[mask], y_all[mask], start_conc, end_conc, weighting, sd, initial=_initial)
+
+
+# --- BOOTSTRAP ---
+# Resampled fits are cached per set of fitted standards; applying them to a
+# new absorbance is a single cheap array operation.
+BOOTSTRAP_RESAMPLES = 2000
+BOOTSTRAP_WORKERS = None  # set to e.g. 4 to spread resamples over a thread pool
+
+
+@st.cache_data(max_entries=64, ttl="2h", show_spinner=False)
+def bootstrap_fit(x_fit, y_fit, w_fit):
+    return bootstrap_line_params(x_fit, y_fit, w_fit, n_boot=BOOTSTRAP_RESAMPLES, workers=BOOTSTRAP_WORKERS)
+
+
+def curve_label(curve):
+    if curve.model == MODEL_LINEAR:
+        return f"y = {curve.slope:.5f}x + {curve.intercept:.4f}"
+    return f"{model_labels[curve.model]} fit (R² = {curve.r_squared:.4f})"
+
+
+# --- INCREMENTAL FIT ---
+# Running sums for the fitted standards live in session state. When only a
+# few absorbance cells changed since the last rerun, the sums are patched for
+# those cells instead of re-accumulated; anything else rebuilds them. Finding
+# the changed cells (like building x, y and the weights) is still a handful of
+# vectorized O(n) passes per rerun, so this saves only the refit's own weighted
+# sums: a small constant factor on large replicate tables, nothing noticeable
+# on the tutorial's nine standards. The sums are uncentred and lose a little
+# precision with each patch, hence the periodic rebuild.
+MAX_INCREMENTAL_EDITS = 8
+REBUILD_AFTER_UPDATES = 1000
+
+
+def _changed_indices(old, new):
+    return np.flatnonzero((old != new) & ~(np.isnan(old) & np.isnan(new)))
 
-    st.header("Step 3: Your standard curve")
 
-    metric_cols = st.columns(3)
-    metric_cols[0].metric("Slope (m)", f"{slope:.5f}")
-    metric_cols[1].metric("Y-intercept (b)", f"{intercept:.4f}")
-    metric_cols[2].metric("R²", f"{r_squared:.4f}")
+def incremental_fit(x_all, y_all, weights_all, start_conc, end_conc, weighting):
+    linear_mask = linear_range_mask(x_all, start_conc, end_conc)
+    state = st.session_state.get("fit_state")
+    changed = None
+    if (
+        state is not None
+        and state["range"] == (start_conc, end_conc)
+        and np.array_equal(state["x"], x_all, equal_nan=True)
+        and state["updates"] < REBUILD_AFTER_UPDATES
+    ):
+        changed = np.union1d(_changed_indices(state["y"], y_all), _changed_indices(state["w"], weights_all))
 
-    if r_squared < 0.95:
-        st.warning(f"R² = {r_squared:.3f} is below 0.95. Your selected range isn't very linear — try adjusting the start or end concentration.")
+    if changed is None or len(changed) > MAX_INCREMENTAL_EDITS:
+        stats = SufficientStats.from_points(x_all[linear_mask], y_all[linear_mask], weights_all[linear_mask])
+        updates = 0
     else:
-        st.success(f"R² = {r_squared:.3f} — strong linear fit. You can trust this equation.")
+        stats = state["stats"]
+        for i in changed[linear_mask[changed]]:
+            stats.replace(
+                (x_all[i], state["y"][i], state["w"][i]),
+                (x_all[i], y_all[i], weights_all[i]),
+            )
+        updates = state["updates"] + len(changed)
+
+    st.session_state["fit_state"] = {
+        "x": x_all, "y": y_all, "w": weights_all, "range": (start_conc, end_conc),
+        "stats": stats, "updates": updates,
+    }
+    return stats.fit(start_conc, end_conc, weighting)
+
+
+@st.cache_data(max_entries=128, ttl="2h", show_spinner=False)
+def render_standard_curve_png(x_all, y_all, curve):
+    # Rasterizing the figure is the most expensive part of a rerun, so the PNG
+    # bytes are cached on the same inputs as the fit. matplotlib is imported
+    # here rather than at the top so sessions that never draw it skip the cost;
+    # the object-oriented Figure also avoids pyplot's global figure registry.
+    from matplotlib.figure import Figure
 
-    # Plot
-    fig, ax = plt.subplots(figsize=(8, 5))
+    linear_mask = linear_range_mask(x_all, curve.start_conc, curve.end_conc)
+    x_linear = x_all[linear_mask]
+    y_linear = y_all[linear_mask]
+
+    fig = Figure(figsize=(8, 5))
+    ax = fig.subplots()
     ax.plot(x_all, y_all, 'o', color='#888888', alpha=0.5, markersize=9, label='Excluded standards')
     ax.plot(x_linear, y_linear, 'o', color='#4A90E2', markersize=10, label='Standards used for fit')
     x_fit = np.linspace(x_linear.min(), x_linear.max(), 100)
-    ax.plot(x_fit, slope * x_fit + intercept, '-', color='#D62728', linewidth=2,
-            label=f'y = {slope:.5f}x + {intercept:.4f}')
+    ax.plot(x_fit, curve.predict(x_fit), '-', color='#D62728', linewidth=2, label=curve_label(curve))
     ax.set_xlabel("Red 40 concentration (µg/mL)", fontsize=11)
     ax.set_ylabel("Absorbance at 510 nm", fontsize=11)
     ax.legend(loc='upper left', fontsize=9, framealpha=0.95)
     ax.grid(True, linestyle=':', alpha=0.4)
     ax.spines['top'].set_visible(False)
     ax.spines['right'].set_visible(False)
-    st.pyplot(fig)
-    plt.close(fig)
-
-    # Save the linear range boundaries for later use
-    absorbance_min = slope * start_conc + intercept if slope > 0 else slope * end_conc + intercept
-    absorbance_max = slope * end_conc + intercept if slope > 0 else slope * start_conc + intercept
 
-    st.info(f"**Your usable absorbance range is approximately {absorbance_min:.3f} to {absorbance_max:.3f}.** Any beverage dilution with absorbance outside this range should not be used for back-calculation.")
+    png = io.BytesIO()
+    fig.savefig(png, format="png", dpi=200, bbox_inches="tight")
+    return png.getvalue()
 
-    # --- STEP 4: BEVERAGE DATA ---
-    st.header("Step 4: Measure your beverage dilutions")
 
-    beverage = st.text_input("Name of beverage you're testing:", value="Gatorade Fruit Punch")
+def standard_curve_chart(x_all, y_all, linear_mask, curve):
+    # Only the standards and a sampled fit line (two end points for a straight
+    # line) are sent; Vega-Lite renders the chart client-side.
+    import altair as alt
 
-    st.markdown("""
-    Enter the absorbance you measured for each of your three beverage dilutions. The app will calculate the Red 40 concentration in each **diluted** sample.
-    """)
-
-    dilution_factors = {"1:10": 10, "1:50": 50, "1:100": 100}
-    df_unknown = pd.DataFrame({
-        "Dilution": list(dilution_factors.keys()),
-        "Dilution Factor": list(dilution_factors.values()),
-        "Absorbance (510 nm)": [np.nan, np.nan, np.nan]
+    points = pd.DataFrame({
+        "conc": x_all,
+        "absorbance": y_all,
+        "series": np.where(linear_mask, "Standards used for fit", "Excluded standards"),
     })
+    x_fit = np.linspace(x_all[linear_mask].min(), x_all[linear_mask].max(), 2 if curve.model == MODEL_LINEAR else 100)
+    fit_line = pd.DataFrame({"conc": x_fit, "absorbance": curve.predict(x_fit)})
 
-    edited_unknown = st.data_editor(
-        df_unknown,
-        key="unknown_editor",
-        disabled=["Dilution", "Dilution Factor"],
-        width="stretch"
+    x_axis = alt.X("conc:Q", title="Red 40 concentration (µg/mL)")
+    y_axis = alt.Y("absorbance:Q", title="Absorbance at 510 nm")
+    point_layer = alt.Chart(points).mark_circle(size=90).encode(
+        x=x_axis,
+        y=y_axis,
+        color=alt.Color(
+            "series:N",
+            title=None,
+            scale=alt.Scale(
+                domain=["Excluded standards", "Standards used for fit"],
+                range=["#888888", "#4A90E2"],
+            ),
+            legend=alt.Legend(orient="top-left"),
+        ),
+        tooltip=[alt.Tooltip("conc:Q", title="µg/mL"), alt.Tooltip("absorbance:Q", title="Absorbance")],
+    )
+    line_layer = alt.Chart(fit_line).mark_line(color="#D62728", strokeWidth=2).encode(x=x_axis, y=y_axis)
+    return (point_layer + line_layer).properties(
+        title=curve_label(curve), height=400
     )
-    edited_unknown["Absorbance (510 nm)"] = pd.to_numeric(edited_unknown["Absorbance (510 nm)"], errors='coerce')
 
-    def concentration_in_diluted_sample(abs_val):
-        if pd.isna(abs_val):
-            return np.nan
-        return round((abs_val - intercept) / slope, 2)
 
-    edited_unknown["Diluted sample (µg/mL)"] = edited_unknown["Absorbance (510 nm)"].apply(concentration_in_diluted_sample)
+@st.cache_data(max_entries=32, ttl="2h", show_spinner=False)
+def back_calculate_plate_files(plate_bytes, plate_name, map_bytes, map_name, curve):
+    absorbance = read_plate_absorbance(io.BytesIO(plate_bytes), plate_name)
+    plate_map = read_plate_map(io.BytesIO(map_bytes), map_name)
+    return back_calculate_plate(curve, absorbance, plate_map)
 
-    def usability_status(abs_val):
-        if pd.isna(abs_val):
-            return "—"
-        if abs_val < absorbance_min:
-            return "Too dilute — below linear range"
-        if abs_val > absorbance_max:
-            return "Too concentrated — above linear range"
-        return "In linear range — usable"
 
-    edited_unknown["Status"] = edited_unknown["Absorbance (510 nm)"].apply(usability_status)
+def fit_standards():
+    linear_mask = linear_range_mask(x_all, start_conc, end_conc)
+    # Replicate SD of each point's concentration, for 1/σ² weighting. A mean
+    # of n readings has variance σ²/n, so fits on the means use its SE.
+    sd_all = None
+    if n_replicates > 1:
+        rep_concs = standards["means"][0]
+        rep_sds = standards["sds"]
+        if fit_on == "Mean of each standard":
+            with np.errstate(divide="ignore", invalid="ignore"):
+                rep_sds = rep_sds / np.sqrt(standards["counts"])
+        sd_all = rep_sds[np.searchsorted(rep_concs, x_all)]
+    weights_all = fit_weights(weighting, x_all, sd_all)
+    usable = linear_mask & ~np.isnan(y_all) & ~np.isnan(weights_all)
+    # Replicates don't add concentrations: a fit needs distinct standards.
+    n_fit_concs = np.unique(x_all[usable]).size
 
-    st.dataframe(edited_unknown, width="stretch")
+    curve = fit_error = None
+    try:
+        if n_fit_concs < MIN_POINTS[model]:
+            pass
+        elif model == MODEL_LINEAR:
+            curve = incremental_fit(x_all, y_all, weights_all, start_conc, end_conc, weighting)
+        else:
+            # Nonlinear fits start from this session's previous parameters for the
+            # same model (a 4PL fit also seeds the 5PL), so small edits converge fast.
+            warm_starts = st.session_state.setdefault("warm_start_params", {})
+            initial = warm_starts.get(model, warm_starts.get(MODEL_4PL) if model == MODEL_5PL else None)
+            curve = fit_calibration_curve(x_all, y_all, start_conc, end_conc, model, weighting, sd_all, _initial=initial)
+            warm_starts[model] = curve.params
+    except ValueError as exc:
+        curve, fit_error = None, str(exc)
+    return {"linear_mask": linear_mask, "weights_all": weights_all, "curve": curve, "error": fit_error, "n_standards": n_fit_concs}
 
 
-    # --- STEP 5: BACK-CALCULATE ---
-    st.header("Step 5: Back-calculate the beverage concentration")
+with timings.section("Fit"):
+    fit = pipeline.run("fit", (fit_on, start_conc, end_conc, weighting, model), fit_standards)
+    linear_mask = fit["linear_mask"]
+    weights_all = fit["weights_all"]
+    curve = fit["curve"]
+    fit_error = fit["error"]
+    # Distinct concentrations fitted; curve.n counts readings, which differ
+    # when every replicate is fitted.
+    n_standards = fit["n_standards"]
 
-    usable_rows = edited_unknown[edited_unknown["Status"] == "In linear range — usable"]
 
-    if len(usable_rows) == 0:
-        if edited_unknown["Absorbance (510 nm)"].notna().any():
-            st.warning("None of your dilutions fall within the linear range of your standard curve. You may need to re-dilute your samples.")
+# --- STEP 3: CURVE EQUATION ---
+if curve is not None:
+    with timings.section("Step 3: standard curve"):
+        r_squared = curve.r_squared
+
+        st.header("Step 3: Your standard curve")
+
+        metric_cols = st.columns(3)
+        if model == MODEL_LINEAR:
+            metric_cols[0].metric("Slope (m)", f"{curve.slope:.5f}")
+            metric_cols[1].metric("Y-intercept (b)", f"{curve.intercept:.4f}")
         else:
-            st.info("Enter your beverage absorbances above to see the back-calculation.")
-    else:
-        st.markdown("""
-Select which usable dilution you want to use for the final back-calculation. If multiple dilutions are usable, they should give you similar answers — differences between them tell you something about your technique.
-""")
+            metric_cols[0].metric("Model", model_labels[model])
+            metric_cols[1].metric("Standards used", f"{n_standards}")
+        metric_cols[2].metric("R²", f"{r_squared:.4f}")
+        if model != MODEL_LINEAR:
+            st.caption(curve.equation)
+        if weighting != WEIGHTING_NONE:
+            fitted_on = f"{n_standards} standards" + (f" ({curve.n} readings)" if curve.n != n_standards else "")
+            st.caption(f"Weighted least squares ({weighting}) on {fitted_on}; R² is the weighted R².")
 
-        usable_options = usable_rows["Dilution"].tolist()
-        chosen_dilution = st.radio("Use this dilution:", usable_options, key="chosen_dilution")
+        if r_squared < 0.95:
+            st.warning(f"R² = {r_squared:.3f} is below 0.95. Your selected range isn't very linear — try adjusting the start or end concentration.")
+        elif model == MODEL_LINEAR:
+            st.success(f"R² = {r_squared:.3f} — strong linear fit. You can trust this equation.")
+        else:
+            st.success(f"R² = {r_squared:.3f} — the {model_labels[model].lower()} curve follows your standards closely.")
+
+        # Plot
+        # The default chart is drawn in the browser from the points and the fit
+        # line; matplotlib is only used when a static image is asked for.
+        static_plot = st.toggle("Show as static image (matplotlib)", key="static_plot")
+        if static_plot:
+            plot = pipeline.run("plot", (static_plot,), lambda: render_standard_curve_png(x_all, y_all, curve))
+            st.image(plot, width="stretch")
+        else:
+            plot = pipeline.run("plot", (static_plot,), lambda: standard_curve_chart(x_all, y_all, linear_mask, curve))
+            st.altair_chart(plot, width="stretch")
+        st.download_button(
+            label="Download plot as PNG",
+            data=lambda: render_standard_curve_png(x_all, y_all, curve),
+            file_name="standard_curve.png",
+            mime="image/png",
+            on_click="ignore",
+            key="download_plot_png"
+        )
+
+        # Save the linear range boundaries for later use
+        absorbance_min, absorbance_max = curve.absorbance_range
 
-        chosen_row = usable_rows[usable_rows["Dilution"] == chosen_dilution].iloc[0]
-        diluted_conc = chosen_row["Diluted sample (µg/mL)"]
-        dilution_factor = chosen_row["Dilution Factor"]
-        original_conc = diluted_conc * dilution_factor
+        st.info(f"**Your usable absorbance range is approximately {absorbance_min:.3f} to {absorbance_max:.3f}.** Any beverage dilution with absorbance outside this range should not be used for back-calculation.")
 
-        st.latex(
-            rf"\text{{Beverage concentration}} = {diluted_conc:.2f} \; \mu g/mL \times {int(dilution_factor)} = {original_conc:.1f} \; \mu g/mL"
+    # --- STEP 4: BEVERAGE DATA ---
+    with timings.section("Step 4: beverage dilutions"):
+        st.header("Step 4: Measure your beverage dilutions")
+
+        beverage = st.text_input("Name of beverage you're testing:", value="Gatorade Fruit Punch")
+
+        st.markdown("""
+        Enter the absorbance you measured for each of your three beverage dilutions. The app will calculate the Red 40 concentration in each **diluted** sample. You can add rows (or paste a column of readings) if you measured more dilutions.
+        """)
+
+        dilution_factors = {"1:10": 10, "1:50": 50, "1:100": 100}
+        df_unknown = pd.DataFrame({
+            "Dilution": list(dilution_factors.keys()),
+            "Dilution Factor": list(dilution_factors.values()),
+            "Absorbance (510 nm)": [np.nan, np.nan, np.nan]
+        })
+
+        edited_unknown = st.data_editor(
+            df_unknown,
+            key="unknown_editor",
+            num_rows="dynamic",
+            width="stretch"
         )
 
-        result_cols = st.columns(3)
-        result_cols[0].metric("Diluted sample", f"{diluted_conc:.2f} µg/mL")
-        result_cols[1].metric("Dilution factor", f"×{int(dilution_factor)}")
-        result_cols[2].metric(f"{beverage}", f"{original_conc:.1f} µg/mL")
+        def process_unknowns():
+            table = edited_unknown.copy()
+            table["Dilution Factor"] = pd.to_numeric(table["Dilution Factor"], errors='coerce')
+            table["Absorbance (510 nm)"] = pd.to_numeric(table["Absorbance (510 nm)"], errors='coerce')
+
+            # Whole-column NumPy operations, so pasting thousands of readings costs
+            # the same handful of array passes as three.
+            unknown_abs = table["Absorbance (510 nm)"].to_numpy(dtype=float)
+            table["Diluted sample (µg/mL)"] = np.round(curve.inverse_predict(unknown_abs), 2)
+            table["Status"] = curve.range_status(unknown_abs)
+            if model == MODEL_LINEAR:
+                # Closed-form prediction interval for a single reading, from the
+                # statistics kept on the fitted line; no refitting involved.
+                pi_low, pi_high = curve.inverse_prediction_interval(unknown_abs)
+                table["95% PI low (µg/mL)"] = np.round(pi_low, 2)
+                table["95% PI high (µg/mL)"] = np.round(pi_high, 2)
+            return table
+
+        edited_unknown = pipeline.run("unknowns", (edited_unknown,), process_unknowns)
+
+        st.dataframe(edited_unknown, width="stretch")
+
+        with st.expander("Bulk import from a plate reader (96/384-well)", expanded=False):
+            st.markdown("""
+Upload your plate-reader export and a plate map giving the dilution factor of each sample well. Both can be CSV or Excel, either as a `Well` column next to the values or laid out like the plate (rows A, B, ... by columns 1, 2, ...). Wells left empty in the plate map are ignored.
+""")
+            plate_col, map_col = st.columns(2)
+            plate_file = plate_col.file_uploader("Plate-reader export", type=["csv", "xlsx"], key="plate_file")
+            map_file = map_col.file_uploader("Plate map (dilution factors)", type=["csv", "xlsx"], key="plate_map_file")
+
+            if plate_file is not None and map_file is not None:
+                try:
+                    plate_results = back_calculate_plate_files(
+                        plate_file.getvalue(), plate_file.name, map_file.getvalue(), map_file.name, curve
+                    )
+                except (ValueError, ImportError) as exc:
+                    st.error(f"Could not read the plate files: {exc}")
+                else:
+                    st.dataframe(plate_results, width="stretch")
+                    st.download_button(
+                        label="Download per-well results",
+                        data=lambda: plate_results.to_csv(index=False).encode('utf-8'),
+                        file_name=f"{beverage.replace(' ', '_')}_plate_results.csv",
+                        mime="text/csv",
+                        on_click="ignore",
+                        key="download_plate_results"
+                    )
+
 
-        st.success(f"**{beverage} contains approximately {original_conc:.1f} µg/mL ({original_conc/1000:.2f} mg/mL) of Red 40.**")
+    # --- STEP 5: BACK-CALCULATE ---
+    with timings.section("Step 5: back-calculation"):
+        st.header("Step 5: Back-calculate the beverage concentration")
 
-        # --- CROSS-CHECK ---
-        if len(usable_rows) > 1:
-            st.markdown("### Cross-check with your other dilutions")
+        def back_calculate():
+            usable_rows = edited_unknown[
+                (edited_unknown["Status"] == STATUS_USABLE)
+                & edited_unknown["Dilution"].notna()
+                & edited_unknown["Dilution Factor"].notna()
+            ]
             check_rows = usable_rows.copy()
             check_rows["Back-calculated beverage (µg/mL)"] = (
                 check_rows["Diluted sample (µg/mL)"] * check_rows["Dilution Factor"]
             ).round(1)
-            st.dataframe(
-                check_rows[["Dilution", "Absorbance (510 nm)", "Diluted sample (µg/mL)", "Back-calculated beverage (µg/mL)"]],
-                width="stretch"
-            )
+            return usable_rows, check_rows
 
-            max_val = check_rows["Back-calculated beverage (µg/mL)"].max()
-            min_val = check_rows["Back-calculated beverage (µg/mL)"].min()
-            spread_pct = (max_val - min_val) / ((max_val + min_val) / 2) * 100 if (max_val + min_val) > 0 else 0
+        usable_rows, check_rows = pipeline.run("back_calc", (), back_calculate)
 
-            if spread_pct < 10:
-                st.success(f"Your dilutions agree to within {spread_pct:.1f}% — that's strong evidence your technique was consistent.")
+        chosen_index = chosen_dilution = original_conc = original_ci = None
+        if len(usable_rows) == 0:
+            if edited_unknown["Absorbance (510 nm)"].notna().any():
+                st.warning("None of your dilutions fall within the linear range of your standard curve. You may need to re-dilute your samples.")
             else:
-                st.info(f"Your dilutions differ by {spread_pct:.1f}%. Differences larger than 10% suggest pipetting variability or reading errors.")
+                st.info("Enter your beverage absorbances above to see the back-calculation.")
+        else:
+            st.markdown("""
+Select which usable dilution you want to use for the final back-calculation. If multiple dilutions are usable, they should give you similar answers — differences between them tell you something about your technique.
+""")
+
+            # Keyed on the row index, so repeated labels stay distinct and a
+            # pasted plate of readings is one searchable dropdown.
+            repeated = usable_rows["Dilution"].duplicated(keep=False)
+            chosen_index = st.selectbox(
+                "Use this dilution:",
+                usable_rows.index,
+                format_func=lambda i: f"{usable_rows.at[i, 'Dilution']} (row {i + 1})" if repeated[i] else str(usable_rows.at[i, "Dilution"]),
+                key="chosen_dilution_row"
+            )
+
+            chosen_row = usable_rows.loc[chosen_index]
+            chosen_dilution = chosen_row["Dilution"]
+            diluted_conc = chosen_row["Diluted sample (µg/mL)"]
+            dilution_factor = chosen_row["Dilution Factor"]
+            original_conc = diluted_conc * dilution_factor
+
+            st.latex(
+                rf"\text{{Beverage concentration}} = {diluted_conc:.2f} \; \mu g/mL \times {dilution_factor:g} = {original_conc:.1f} \; \mu g/mL"
+            )
+
+            result_cols = st.columns(3)
+            result_cols[0].metric("Diluted sample", f"{diluted_conc:.2f} µg/mL")
+            result_cols[1].metric("Dilution factor", f"×{dilution_factor:g}")
+            result_cols[2].metric(f"{beverage}", f"{original_conc:.1f} µg/mL")
+
+            st.success(f"**{beverage} contains approximately {original_conc:.1f} µg/mL ({original_conc/1000:.2f} mg/mL) of Red 40.**")
+
+            if model == MODEL_LINEAR:
+                fit_points = linear_mask & ~np.isnan(y_all) & ~np.isnan(weights_all)
+                boot_slopes, boot_intercepts = bootstrap_fit(x_all[fit_points], y_all[fit_points], weights_all[fit_points])
+                ci_low, ci_high = bootstrap_inverse_ci(boot_slopes, boot_intercepts, chosen_row["Absorbance (510 nm)"])
+                original_ci = (float(ci_low) * dilution_factor, float(ci_high) * dilution_factor)
+                st.caption(
+                    f"95% bootstrap confidence interval: {original_ci[0]:.1f} to {original_ci[1]:.1f} µg/mL "
+                    f"(from refitting {BOOTSTRAP_RESAMPLES} resamples of your standards)."
+                )
+
+            # --- CROSS-CHECK ---
+            with timings.section("Cross-check"):
+                if len(usable_rows) > 1:
+                    st.markdown("### Cross-check with your other dilutions")
+                    st.dataframe(
+                        check_rows[["Dilution", "Absorbance (510 nm)", "Diluted sample (µg/mL)", "Back-calculated beverage (µg/mL)"]],
+                        width="stretch"
+                    )
+
+                    spread_pct = spread_percent(check_rows["Back-calculated beverage (µg/mL)"])
+
+                    if spread_pct < 10:
+                        st.success(f"Your dilutions agree to within {spread_pct:.1f}% — that's strong evidence your technique was consistent.")
+                    else:
+                        st.info(f"Your dilutions differ by {spread_pct:.1f}%. Differences larger than 10% suggest pipetting variability or reading errors.")
 
     # --- DOWNLOAD ---
-    st.markdown("---")
-    st.subheader("Download your results")
-
-    def generate_combined_csv():
-        content = f"Standard Curve Data\n"
-        content += edited_std.to_csv(index=False)
-        content += f"\n\nLinear Fit\n"
-        content += f"Range used: {start_conc} to {end_conc} µg/mL\n"
-        content += f"Absorbance = {slope:.5f} * Concentration + {intercept:.4f}\n"
-        content += f"R-squared: {r_squared:.4f}\n\n"
-        content += f"Beverage: {beverage}\n"
-        content += edited_unknown.to_csv(index=False)
-
-        if len(usable_rows) > 0:
-            content += f"\n\nFinal beverage concentration (based on {chosen_dilution} dilution): {original_conc:.1f} µg/mL\n"
-        else:
-            content += "\n\nNo usable dilution was identified for back-calculation.\n"
+    with timings.section("Download"):
+        st.markdown("---")
+        st.subheader("Download your results")
 
-        return content.encode('utf-8')
+        def generate_combined_csv():
+            # Tables are streamed straight into one UTF-8 byte buffer rather than
+            # built up as strings, so the cost stays linear in the output size.
+            buffer = io.BytesIO()
+            out = io.TextIOWrapper(buffer, encoding="utf-8", newline="")
+            out.write("Standard Curve Data\n")
+            edited_std.to_csv(out, index=False)
+            out.write("\n\nLinear Fit\n")
+            out.write(f"Range used: {start_conc} to {end_conc} µg/mL\n")
+            out.write(f"Weighting: {weighting_labels[weighting]}\n")
+            out.write(f"Model: {model_labels[model]}\n")
+            out.write(f"{curve.equation}\n")
+            out.write(f"R-squared: {r_squared:.4f}\n\n")
+            out.write(f"Beverage: {beverage}\n")
+            edited_unknown.to_csv(out, index=False)
 
-    st.download_button(
-        label="Download CSV of all results",
-        data=generate_combined_csv(),
-        file_name=f"{beverage.replace(' ', '_')}_standard_curve_results.csv",
-        mime="text/csv",
-        key="download_all_results"
-    )
+            if len(usable_rows) > 0:
+                out.write(f"\n\nFinal beverage concentration (based on {chosen_dilution} dilution): {original_conc:.1f} µg/mL\n")
+                if original_ci is not None:
+                    out.write(f"95% bootstrap confidence interval: {original_ci[0]:.1f} to {original_ci[1]:.1f} µg/mL\n")
+            else:
+                out.write("\n\nNo usable dilution was identified for back-calculation.\n")
+
+            out.flush()
+            out.detach()
+            return buffer.getvalue()
 
+        # The CSV is only built when the button is clicked, and the export stage
+        # reuses it for repeat downloads until one of its inputs changes.
+        st.download_button(
+            label="Download CSV of all results",
+            data=lambda: pipeline.run("export", (beverage, chosen_index, original_ci), generate_combined_csv),
+            file_name=f"{beverage.replace(' ', '_')}_standard_curve_results.csv",
+            mime="text/csv",
+            on_click="ignore",
+            key="download_all_results"
+        )
+
+        if original_conc is not None:
+            submit_cols = st.columns([3, 1], vertical_alignment="bottom")
+            student = submit_cols[0].text_input("Your name (for your instructor):", key="student_name")
+            if submit_cols[1].button("Submit my result", key="submit_result", disabled=not student.strip()):
+                submission_store(SUBMISSIONS_DB).add(
+                    student=student.strip(),
+                    beverage=beverage,
+                    model=model,
+                    weighting=weighting,
+                    dilution=chosen_dilution,
+                    slope=curve.slope if model == MODEL_LINEAR else None,
+                    intercept=curve.intercept if model == MODEL_LINEAR else None,
+                    r_squared=float(r_squared),
+                    original_conc=float(original_conc),
+                )
+                st.success("Your result was submitted. Submitting again for this beverage replaces it.")
+
+elif fit_error is not None:
+    st.error(f"Could not fit the {model_labels[model].lower()} model on this range: {fit_error}")
+elif model != MODEL_LINEAR and np.count_nonzero(linear_mask) >= 2:
+    st.error(f"The {model_labels[model].lower()} model needs at least {MIN_POINTS[model]} standards in the selected range.")
+elif weighting != WEIGHTING_NONE and np.count_nonzero(linear_mask) >= 2:
+    st.error(f"Fewer than two standards in this range can be weighted by {weighting}. Enter replicate readings or choose another weighting.")
 else:
     st.error("Select a range with at least two data points to perform the linear fit.")
+
+
+# --- MULTIPLE DYES ---
+# Each dye has its own standards table and wavelength. Fitted curves are kept
+# per dye on a fingerprint of its definition and table, and all dyes whose
+# inputs changed are refitted together in one batched StandardCurve.fit_many
+# call, so editing one dye's standards leaves the others' fits alone.
+DEFAULT_ANALYTES = pd.DataFrame({
+    "Analyte": ["Red 40", "Yellow 5", "Blue 1"],
+    "Wavelength (nm)": [510.0, 427.0, 630.0],
+    "Start (µg/mL)": [np.nan, np.nan, np.nan],
+    "End (µg/mL)": [np.nan, np.nan, np.nan],
+})
+
+
+def analyte_absorbance_column(wavelength):
+    return f"Absorbance ({wavelength:g} nm)"
+
+
+def fit_analyte_curves(analytes, standards_tables):
+    cache = st.session_state.setdefault("analyte_fits", {})
+    keys = {
+        name: fingerprint(wavelength, start, end, standards_tables[name])
+        for name, wavelength, start, end in analytes.itertuples(index=False)
+    }
+    for name in set(cache) - set(keys):
+        del cache[name]
+    stale = [name for name in keys if name not in cache or cache[name][0] != keys[name]]
+    if stale:
+        x = np.full((len(stale), max(len(standards_tables[name]) for name in stale)), np.nan)
+        y = np.full_like(x, np.nan)
+        for row, name in enumerate(stale):
+            table = standards_tables[name].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+            x[row, :len(table)] = table[:, 0]
+            y[row, :len(table)] = table[:, 1]
+        bounds = analytes.set_index("Analyte").loc[stale]
+        curves = StandardCurve.fit_many(x, y, bounds["Start (µg/mL)"].to_numpy(), bounds["End (µg/mL)"].to_numpy())
+        for name, curve in zip(stale, curves):
+            cache[name] = (keys[name], curve)
+    return {name: cache[name][1] for name in keys}
+
+
+@st.cache_data(max_entries=16, ttl="2h", show_spinner=False)
+def load_spectra(file_bytes, file_name):
+    return read_spectra(io.BytesIO(file_bytes), file_name)
+
+
+@st.cache_data(max_entries=16, ttl="2h", show_spinner=False)
+def fit_spectral_calibration(wavelengths, standard_spectra, concentrations, analytes):
+    return SpectralCalibration.fit(wavelengths, standard_spectra, concentrations, analytes)
+
+
+with timings.section("Multiple dyes"):
+    st.markdown("---")
+    st.header("Optional: several dyes in one beverage")
+    multi_dye = st.toggle("Analyze several dyes", key="multi_dye")
+
+if multi_dye:
+    with timings.section("Multiple dyes"):
+        st.markdown("""
+Many beverages contain more than one dye. List each dye with the wavelength you read it at, enter a standard curve for each one, then enter every dilution's absorbance at each wavelength. Each dye gets its own straight-line fit (over its start/end range, or all of its standards if left blank).
+
+If the dyes' absorbance bands overlap, switch to **full spectra**: the whole spectrum of each beverage is then split into the contributions of the individual dyes.
+""")
+        analytes = st.data_editor(DEFAULT_ANALYTES, key="analytes_editor", num_rows="dynamic", hide_index=True, width="stretch")
+        analytes = analytes.assign(Analyte=analytes["Analyte"].astype("string").str.strip())
+        analytes = analytes[analytes["Analyte"].notna() & (analytes["Analyte"] != "") & analytes["Wavelength (nm)"].notna()]
+        readings_mode = st.radio(
+            "Readings:",
+            ["One wavelength per dye", "Full spectra"],
+            horizontal=True,
+            key="dye_readings_mode"
+        )
+
+        if analytes["Analyte"].duplicated().any():
+            st.error("Each dye needs a unique name.")
+        elif len(analytes) > 0 and readings_mode == "One wavelength per dye":
+            analytes = analytes.reset_index(drop=True)
+            standards_tables = {}
+            for tab, name, wavelength in zip(st.tabs(analytes["Analyte"].tolist()), analytes["Analyte"], analytes["Wavelength (nm)"]):
+                example = default_abs if name == "Red 40" else [np.nan] * len(default_concs)
+                standards_tables[name] = tab.data_editor(
+                    pd.DataFrame({"Concentration (µg/mL)": default_concs, analyte_absorbance_column(wavelength): example}),
+                    key=f"analyte_std_{name}_{wavelength:g}",
+                    num_rows="dynamic",
+                    width="stretch"
+                )
+
+            analyte_curves = fit_analyte_curves(analytes, standards_tables)
+            fitted = [
+                (name, wavelength)
+                for name, wavelength in zip(analytes["Analyte"], analytes["Wavelength (nm)"])
+                if analyte_curves[name] is not None
+            ]
+            st.dataframe(
+                pd.DataFrame({
+                    "Analyte": analytes["Analyte"],
+                    "Wavelength (nm)": analytes["Wavelength (nm)"],
+                    "Equation": [c.equation if c is not None else "Needs at least two standards" for c in analyte_curves.values()],
+                    "R²": [round(c.r_squared, 4) if c is not None else np.nan for c in analyte_curves.values()],
+                    "Standards used": [c.n if c is not None else 0 for c in analyte_curves.values()],
+                }),
+                hide_index=True,
+                width="stretch"
+            )
+
+            abs_columns = [analyte_absorbance_column(w) for w in dict.fromkeys(analytes["Wavelength (nm)"])]
+            dye_unknowns = st.data_editor(
+                pd.DataFrame({
+                    "Dilution": ["1:10", "1:50", "1:100"],
+                    "Dilution Factor": [10, 50, 100],
+                    **{column: np.nan for column in abs_columns},
+                }),
+                key=f"analyte_unknowns_{fingerprint(abs_columns)}",
+                num_rows="dynamic",
+                width="stretch"
+            )
+
+            if fitted:
+                # One broadcast back-calculates every dilution against every dye's curve.
+                fitted_curves = [analyte_curves[name] for name, _ in fitted]
+                readings = dye_unknowns[[analyte_absorbance_column(w) for _, w in fitted]].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+                factors = pd.to_numeric(dye_unknowns["Dilution Factor"], errors='coerce').to_numpy(dtype=float)
+                slopes = np.array([c.slope for c in fitted_curves])
+                intercepts = np.array([c.intercept for c in fitted_curves])
+                diluted = (readings - intercepts) / slopes
+                original = diluted * factors[:, None]
+
+                dye_results = dye_unknowns[["Dilution", "Dilution Factor"]].copy()
+                for j, ((name, _), curve) in enumerate(zip(fitted, fitted_curves)):
+                    dye_results[f"{name} diluted (µg/mL)"] = np.round(diluted[:, j], 2)
+                    dye_results[f"{name} in beverage (µg/mL)"] = np.round(original[:, j], 1)
+                    dye_results[f"{name} status"] = curve.range_status(readings[:, j])
+                st.dataframe(dye_results, width="stretch")
+                st.download_button(
+                    label="Download dye results",
+                    data=lambda: dye_results.to_csv(index=False).encode('utf-8'),
+                    file_name="dye_results.csv",
+                    mime="text/csv",
+                    on_click="ignore",
+                    key="download_dye_results"
+                )
+        elif len(analytes) > 0:
+            # --- FULL-SPECTRUM MODE ---
+            st.markdown("""
+Upload the spectra as CSV or Excel files with the wavelength (nm) in the first column and one column per spectrum. Then enter the concentration of every dye in each standard (0 where a dye is absent). Single-dye dilution series and mixed standards can be combined.
+""")
+            analyte_names = analytes["Analyte"].tolist()
+            spectra_cols = st.columns(2)
+            standard_file = spectra_cols[0].file_uploader("Standard spectra", type=["csv", "xlsx"], key="standard_spectra_file")
+            unknown_file = spectra_cols[1].file_uploader("Beverage spectra", type=["csv", "xlsx"], key="unknown_spectra_file")
+
+            if standard_file is not None:
+                try:
+                    standard_wavelengths, standard_names, standard_spectra = load_spectra(standard_file.getvalue(), standard_file.name)
+                    if unknown_file is not None:
+                        unknown_wavelengths, sample_names, unknown_spectra = load_spectra(unknown_file.getvalue(), unknown_file.name)
+                        standard_wavelengths, standard_spectra, unknown_spectra = common_wavelengths(
+                            standard_wavelengths, standard_spectra, unknown_wavelengths, unknown_spectra
+                        )
+                except (ValueError, ImportError) as exc:
+                    st.error(f"Could not read the spectra: {exc}")
+                else:
+                    composition = st.data_editor(
+                        pd.DataFrame({"Standard": standard_names, **{name: 0.0 for name in analyte_names}}),
+                        key=f"standard_composition_{fingerprint(standard_names, analyte_names)}",
+                        disabled=["Standard"],
+                        hide_index=True,
+                        width="stretch"
+                    )
+                    try:
+                        calibration = fit_spectral_calibration(
+                            standard_wavelengths, standard_spectra,
+                            composition[analyte_names].to_numpy(dtype=float), tuple(analyte_names),
+                        )
+                    except ValueError as exc:
+                        st.warning(f"Can't build the pure-dye spectra yet: {exc}")
+                    else:
+                        st.caption(
+                            f"Pure-dye spectra estimated from {len(standard_names)} standards over "
+                            f"{standard_wavelengths.min():g}–{standard_wavelengths.max():g} nm ({len(standard_wavelengths)} wavelengths)."
+                        )
+                        if unknown_file is not None:
+                            spectrum_factors = st.data_editor(
+                                pd.DataFrame({"Sample": sample_names, "Dilution Factor": 1.0}),
+                                key=f"spectrum_dilutions_{fingerprint(sample_names)}",
+                                disabled=["Sample"],
+                                hide_index=True,
+                                width="stretch"
+                            )
+                            # All beverage spectra are unmixed together in one batched solve.
+                            unmixed, residual_rms = calibration.unmix(unknown_spectra)
+                            factors = pd.to_numeric(spectrum_factors["Dilution Factor"], errors='coerce').to_numpy(dtype=float)
+                            spectrum_results = spectrum_factors.copy()
+                            for j, name in enumerate(analyte_names):
+                                spectrum_results[f"{name} diluted (µg/mL)"] = np.round(unmixed[j], 2)
+                                spectrum_results[f"{name} in beverage (µg/mL)"] = np.round(unmixed[j] * factors, 1)
+                            spectrum_results["Fit residual (RMS absorbance)"] = np.round(residual_rms, 4)
+                            st.dataframe(spectrum_results, hide_index=True, width="stretch")
+                            st.download_button(
+                                label="Download spectrum results",
+                                data=lambda: spectrum_results.to_csv(index=False).encode('utf-8'),
+                                file_name="spectrum_results.csv",
+                                mime="text/csv",
+                                on_click="ignore",
+                                key="download_spectrum_results"
+                            )
+
+
+# --- TIMINGS ---
+report_timings()
@@ -0,0 +1,222 @@
+"""Class-wide collection and summary of student results.
+
+Students submit their fit and final concentration from the app; submissions
+are kept in a local SQLite file by :class:`SubmissionStore`, one per student
+and beverage (path from the ``STANDARD_CURVE_SUBMISSIONS_DB`` environment
+variable if set). The
+instructor dashboard keeps a :class:`ClassSummary` that only reads rows added
+since its last refresh and folds them into running per-beverage moments
+(count, mean, sum of squared deviations, min, max) with vectorized pandas
+groupbys, so refreshing never rescans the whole store.
+"""
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+SUBMISSION_FIELDS = (
+    "student", "beverage", "model", "weighting", "dilution",
+    "slope", "intercept", "r_squared", "original_conc",
+)
+NUMERIC_FIELDS = ("slope", "intercept", "r_squared", "original_conc")
+SUMMARY_METRICS = ("original_conc", "slope", "r_squared")
+MOMENT_COLUMNS = ("n", "mean", "m2", "min", "max")
+OUTLIER_Z = 2.5
+MIN_R_SQUARED = 0.95
+
+SUBMISSIONS_DB_ENV = "STANDARD_CURVE_SUBMISSIONS_DB"
+INSTRUCTOR_PASSWORD_ENV = "STANDARD_CURVE_INSTRUCTOR_PASSWORD"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    submitted_at TEXT NOT NULL,
+    student TEXT,
+    beverage TEXT,
+    model TEXT,
+    weighting TEXT,
+    dilution TEXT,
+    slope REAL,
+    intercept REAL,
+    r_squared REAL,
+    original_conc REAL,
+    UNIQUE (student, beverage)
+)
+"""
+
+
+class SubmissionStore:
+    """SQLite table of submissions at ``path``, one per student and beverage.
+
+    Submitting again replaces the earlier row with a new one (and a new id),
+    so resubmissions don't skew the class statistics and still show up in
+    :meth:`fetch_since`. A connection is opened per call, so one store can be
+    shared between the threads Streamlit runs sessions on.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        with self._connect() as connection:
+            connection.execute(_SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def add(self, **fields):
+        """Insert or replace one submission (keys from :data:`SUBMISSION_FIELDS`); returns its id."""
+        unknown = set(fields) - set(SUBMISSION_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown submission fields: {sorted(unknown)}")
+        columns = ("submitted_at",) + SUBMISSION_FIELDS
+        values = [datetime.now(timezone.utc).isoformat(timespec="seconds")]
+        values += [fields.get(name) for name in SUBMISSION_FIELDS]
+        with self._connect() as connection:
+            cursor = connection.execute(
+                f"INSERT OR REPLACE INTO submissions ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                values,
+            )
+            return cursor.lastrowid
+
+    def fetch_since(self, last_id=0):
+        """Submissions with ``id > last_id`` in insertion order.
+
+        The numeric fields are always float: a batch of only nonlinear fits
+        (no slope or intercept) would otherwise come back as object columns
+        of ``None``.
+        """
+        with self._connect() as connection:
+            rows = pd.read_sql_query(
+                "SELECT * FROM submissions WHERE id > ? ORDER BY id", connection, params=(int(last_id),)
+            )
+        return rows.astype({name: float for name in NUMERIC_FIELDS})
+
+
+def _group_moments(rows, metric):
+    grouped = rows.groupby("beverage")[metric].agg(["count", "mean", "var", "min", "max"])
+    grouped["m2"] = grouped.pop("var").fillna(0.0) * (grouped["count"] - 1).clip(lower=0)
+    return grouped.rename(columns={"count": "n"})
+
+
+def _merge_moments(current, new):
+    # Chan et al.'s pairwise update of count, mean and M2, row-wise per group.
+    index = current.index.union(new.index)
+    a = current.reindex(index)
+    b = new.reindex(index)
+    n_a = a["n"].fillna(0)
+    n_b = b["n"].fillna(0)
+    n = n_a + n_b
+    with np.errstate(invalid="ignore", divide="ignore"):
+        delta = b["mean"].fillna(0) - a["mean"].fillna(0)
+        mean = np.where(n_b == 0, a["mean"], np.where(n_a == 0, b["mean"], a["mean"] + delta * n_b / n))
+        m2 = a["m2"].fillna(0) + b["m2"].fillna(0) + np.where(n > 0, delta ** 2 * n_a * n_b / n, 0.0)
+    return pd.DataFrame({
+        "n": n,
+        "mean": mean,
+        "m2": m2,
+        "min": np.fmin(a["min"], b["min"]),
+        "max": np.fmax(a["max"], b["max"]),
+    }, index=index)
+
+
+def _standard_deviation(moments):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.sqrt(moments["m2"] / (moments["n"] - 1)).where(moments["n"] > 1)
+
+
+class ClassSummary:
+    """Running statistics over all submissions seen so far."""
+
+    def __init__(self):
+        self.last_id = 0
+        self.submissions = pd.DataFrame()
+        self.moments = {metric: pd.DataFrame(columns=MOMENT_COLUMNS, dtype=float) for metric in SUMMARY_METRICS}
+        self._lock = threading.Lock()
+
+    def update(self, new_rows):
+        """Fold ``new_rows`` (as returned by :meth:`SubmissionStore.fetch_since`) in.
+
+        A new row for a student and beverage already seen replaces the old
+        one; only the beverages affected are re-aggregated.
+        """
+        if new_rows.empty:
+            return 0
+        with self._lock:
+            new_rows = new_rows[new_rows["id"] > self.last_id]
+            if new_rows.empty:
+                return 0
+            rows = self.submissions
+            if not rows.empty:
+                replaced = pd.MultiIndex.from_frame(rows[["student", "beverage"]]).isin(
+                    pd.MultiIndex.from_frame(new_rows[["student", "beverage"]])
+                )
+                if replaced.any():
+                    affected = rows.loc[replaced, "beverage"].unique()
+                    rows = rows[~replaced]
+                    remaining = rows[rows["beverage"].isin(affected)]
+                    for metric in SUMMARY_METRICS:
+                        kept = self.moments[metric].drop(index=affected)
+                        self.moments[metric] = _merge_moments(kept, _group_moments(remaining, metric))
+            for metric in SUMMARY_METRICS:
+                self.moments[metric] = _merge_moments(self.moments[metric], _group_moments(new_rows, metric))
+            if rows.empty:
+                self.submissions = new_rows.reset_index(drop=True)
+            else:
+                self.submissions = pd.concat([rows, new_rows], ignore_index=True)
+            self.last_id = int(new_rows["id"].max())
+            return len(new_rows)
+
+    def refresh(self, store):
+        """Read and fold in the submissions added to ``store`` since the last refresh."""
+        return self.update(store.fetch_since(self.last_id))
+
+    def beverage_summary(self):
+        """Per-beverage count, mean, SD, CV and range of the final concentration."""
+        moments = self.moments["original_conc"]
+        sd = _standard_deviation(moments)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cv = sd / moments["mean"] * 100
+        return pd.DataFrame({
+            "Submissions": moments["n"].astype(int),
+            "Mean (µg/mL)": moments["mean"],
+            "SD (µg/mL)": sd,
+            "CV (%)": cv,
+            "Min (µg/mL)": moments["min"],
+            "Max (µg/mL)": moments["max"],
+        }).rename_axis("Beverage")
+
+    def class_statistics(self, metric):
+        """``(n, mean, sd)`` of ``metric`` across all beverages, from the group moments."""
+        moments = self.moments[metric]
+        n = moments["n"].sum()
+        if n == 0:
+            return 0, np.nan, np.nan
+        mean = (moments["n"] * moments["mean"].fillna(0)).sum() / n
+        m2 = moments["m2"].sum() + (moments["n"] * (moments["mean"].fillna(mean) - mean) ** 2).sum()
+        return int(n), float(mean), float(np.sqrt(m2 / (n - 1))) if n > 1 else np.nan
+
+    def flag_outliers(self, z=OUTLIER_Z, min_r_squared=MIN_R_SQUARED):
+        """All submissions with z-scores and a reason column for the suspicious ones.
+
+        Concentrations are compared with their beverage's mean and SD, slopes
+        with the whole class (everyone calibrates the same dye); fits below
+        ``min_r_squared`` are flagged too.
+        """
+        rows = self.submissions
+        if rows.empty:
+            return rows
+        moments = self.moments["original_conc"]
+        _, slope_mean, slope_sd = self.class_statistics("slope")
+        with np.errstate(invalid="ignore", divide="ignore"):
+            conc_z = (rows["original_conc"] - rows["beverage"].map(moments["mean"])) / rows["beverage"].map(_standard_deviation(moments))
+            slope_z = (rows["slope"] - slope_mean) / slope_sd
+        reasons = pd.DataFrame({
+            f"concentration off by more than {z:g} SD": conc_z.abs() > z,
+            f"slope off by more than {z:g} SD": slope_z.abs() > z,
+            f"R² below {min_r_squared:g}": rows["r_squared"] < min_r_squared,
+        })
+        flag = pd.Series("", index=rows.index)
+        for reason, flagged in reasons.items():
+            flag = flag.mask(flagged, flag + "; " + reason)
+        return rows.assign(conc_z=conc_z.round(2), slope_z=slope_z.round(2), flag=flag.str.removeprefix("; "))
@@ -0,0 +1,153 @@
+import io
+import unittest
+
+import numpy as np
+
+from calibration_models import MODEL_5PL, MODEL_QUADRATIC, fit_calibration
+from pipeline import Pipeline
+from plate_import import back_calculate_plate, read_plate_absorbance, read_plate_map
+from spectra import SpectralCalibration
+from standard_curve import (
+    STATUS_TOO_CONCENTRATED,
+    STATUS_TOO_DILUTE,
+    STATUS_USABLE,
+    StandardCurve,
+    SufficientStats,
+    detect_linear_range,
+    t_quantile,
+)
+
+# The tutorial's default standards (µg/mL and absorbance at 510 nm).
+CONCS = np.array([2000.0, 1000.0, 500.0, 250.0, 125.0, 62.5, 31.25, 15.6, 0.0])
+ABSORBANCE = np.array([2.000, 1.450, 0.850, 0.440, 0.220, 0.110, 0.055, 0.028, 0.000])
+
+
+class StandardCurveTest(unittest.TestCase):
+    def test_fit_matches_linregress(self):
+        # Reference values from scipy.stats.linregress on the same points.
+        mask = (CONCS >= 15.6) & (CONCS <= 1000)
+        curve = StandardCurve.fit(CONCS[mask], ABSORBANCE[mask])
+        self.assertAlmostEqual(curve.slope, 0.0014631867549376209, places=12)
+        self.assertAlmostEqual(curve.intercept, 0.035646480405647385, places=12)
+        self.assertAlmostEqual(curve.r_value, 0.9961920451088155, places=12)
+        self.assertAlmostEqual(curve.stderr, 5.726888760189537e-05, places=12)
+        self.assertAlmostEqual(curve.intercept_stderr, 0.024993421566576378, places=12)
+        self.assertEqual((curve.start_conc, curve.end_conc), (15.6, 1000.0))
+
+    def test_inverse_predict_and_range_status(self):
+        curve = StandardCurve.fit(CONCS[1:], ABSORBANCE[1:])
+        conc = np.array([20.0, 400.0])
+        np.testing.assert_allclose(curve.inverse_predict(curve.predict(conc)), conc)
+        low, high = curve.absorbance_range
+        statuses = curve.range_status([low - 0.01, (low + high) / 2, high + 0.01])
+        self.assertEqual(list(statuses), [STATUS_TOO_DILUTE, STATUS_USABLE, STATUS_TOO_CONCENTRATED])
+
+    def test_t_quantile_matches_tables(self):
+        table = {
+            (0.975, 1): 12.706, (0.975, 2): 4.303, (0.995, 3): 5.841, (0.975, 5): 2.571,
+            (0.975, 10): 2.228, (0.975, 30): 2.042, (0.95, 120): 1.658, (0.975, 1000): 1.962,
+        }
+        for (p, df), expected in table.items():
+            self.assertAlmostEqual(t_quantile(p, df), expected, places=3, msg=f"p={p}, df={df}")
+        self.assertAlmostEqual(t_quantile(0.025, 7), -t_quantile(0.975, 7), places=12)
+
+    def test_sufficient_stats_replace_matches_refit(self):
+        x, y = CONCS[1:-1], ABSORBANCE[1:-1]
+        weights = 1.0 / x
+        stats = SufficientStats.from_points(x, y, weights)
+        edited = y.copy()
+        edited[3] = 0.23
+        stats.replace((x[3], y[3], weights[3]), (x[3], 0.23, weights[3]))
+        patched = stats.fit(x.min(), x.max(), weighting="1/x")
+        refit = StandardCurve.fit(x, edited, weighting="1/x")
+        self.assertAlmostEqual(patched.slope, refit.slope, places=12)
+        self.assertAlmostEqual(patched.intercept, refit.intercept, places=12)
+        self.assertAlmostEqual(patched.r_value, refit.r_value, places=10)
+
+    def test_detect_linear_range_drops_saturated_top(self):
+        window = detect_linear_range(CONCS, ABSORBANCE, min_r_squared=0.999)
+        self.assertEqual((window.start_conc, window.end_conc), (0.0, 500.0))
+        self.assertEqual(window.n_standards, 7)
+        self.assertGreaterEqual(window.r_squared, 0.999)
+        # A looser threshold admits the bending 1000 µg/mL standard too.
+        self.assertEqual(detect_linear_range(CONCS, ABSORBANCE, min_r_squared=0.99).end_conc, 1000.0)
+
+    def test_detect_linear_range_counts_concentrations_not_replicates(self):
+        x = np.repeat([100.0, 200.0], 3)
+        y = np.repeat([1.0, 2.0], 3) + np.tile([-0.01, 0.0, 0.01], 2)
+        self.assertIsNone(detect_linear_range(x, y, min_r_squared=0.9))
+
+
+class CalibrationModelTest(unittest.TestCase):
+    def test_quadratic_turning_inside_range_is_rejected(self):
+        y = ABSORBANCE.copy()
+        y[0] = 1.30
+        with self.assertRaisesRegex(ValueError, "turns over"):
+            fit_calibration(MODEL_QUADRATIC, CONCS, y, 0.0, 2000.0)
+
+    def test_warm_started_5pl_converges_quickly(self):
+        curve = fit_calibration(MODEL_5PL, CONCS, ABSORBANCE)
+        edited = ABSORBANCE.copy()
+        edited[3] = 0.45
+        warm = fit_calibration(MODEL_5PL, CONCS, edited, initial=curve.params)
+        self.assertLessEqual(warm.iterations, 20)
+        self.assertGreater(warm.r_squared, 0.999)
+        np.testing.assert_allclose(warm.inverse_predict(warm.predict([100.0, 800.0])), [100.0, 800.0], rtol=1e-6)
+
+
+class SpectralCalibrationTest(unittest.TestCase):
+    def test_nonnegative_unmixing_recovers_mixtures(self):
+        wavelengths = np.arange(400.0, 701.0)
+        pure = np.column_stack([
+            np.exp(-0.5 * ((wavelengths - centre) / 30) ** 2) / 100 for centre in (427, 510, 630)
+        ])
+        standards = np.eye(3) * 50
+        calibration = SpectralCalibration.fit(wavelengths, pure @ standards.T, standards, ("Yellow 5", "Red 40", "Blue 1"))
+
+        truth = np.array([[10.0, 0.0], [25.0, 40.0], [0.0, 5.0]])
+        concentrations, residual_rms = calibration.unmix(pure @ truth)
+        np.testing.assert_allclose(concentrations, truth, atol=1e-3)
+        np.testing.assert_allclose(residual_rms, 0.0, atol=1e-4)
+
+        # Noise that would drive an unconstrained estimate negative is clipped to zero.
+        noisy = pure @ truth - 0.002 * pure[:, [0]]
+        concentrations, _ = calibration.unmix(noisy)
+        unconstrained, _ = calibration.unmix(noisy, nonnegative=False)
+        self.assertLess(unconstrained[0, 1], 0)
+        self.assertEqual(concentrations[0, 1], 0.0)
+        self.assertTrue((concentrations >= 0).all())
+
+
+class PipelineTest(unittest.TestCase):
+    def test_recomputes_only_changed_stages_and_downstream(self):
+        pipeline = Pipeline({"standards": (), "fit": ("standards",), "unknowns": ("fit",)})
+        for stage in ("standards", "fit", "unknowns"):
+            pipeline.run(stage, (1,), lambda: stage)
+        pipeline.run("standards", (1,), lambda: "standards")
+        pipeline.run("fit", (2,), lambda: "fit")
+        pipeline.run("unknowns", (1,), lambda: "unknowns")
+        self.assertEqual(pipeline.recompute_counts, {"standards": 1, "fit": 2, "unknowns": 2})
+
+
+class PlateImportTest(unittest.TestCase):
+    def test_long_export_ignores_code_like_headers(self):
+        absorbance = read_plate_absorbance(io.StringIO("Well,Sample Code,Absorbance\nA1,101,0.5\nA02,102,0.6\n"), "plate.csv")
+        self.assertEqual(absorbance["Well"].tolist(), ["A1", "A2"])
+        self.assertEqual(absorbance["Absorbance (510 nm)"].tolist(), [0.5, 0.6])
+        with self.assertRaises(ValueError):
+            read_plate_absorbance(io.StringIO("Well,Sample,Reading\nA1,101,0.5\n"), "plate.csv")
+
+    def test_grid_plate_back_calculation(self):
+        curve = StandardCurve.fit(CONCS[1:], ABSORBANCE[1:])
+        absorbance = read_plate_absorbance(io.StringIO(",1,2\nA,0.5,0.3\nB,0.2,0.9\n"), "plate.csv")
+        plate_map = read_plate_map(io.StringIO(",1,2\nA,10,20\nB,,50\n"), "map.csv")
+        wells = back_calculate_plate(curve, absorbance, plate_map)
+        self.assertEqual(wells["Well"].tolist(), ["A1", "A2", "B2"])
+        np.testing.assert_allclose(
+            wells["Original sample (µg/mL)"],
+            np.round(np.round(curve.inverse_predict([0.5, 0.3, 0.9]), 2) * [10, 20, 50], 1),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
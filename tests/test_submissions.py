@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from submissions import ClassSummary, SubmissionStore
+
+
+class SubmissionsTest(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+        self.store = SubmissionStore(self.path)
+
+    def add(self, student, beverage, conc, slope=None, r_squared=0.99, model="4PL"):
+        self.store.add(
+            student=student, beverage=beverage, model=model, weighting="none", dilution="1:10",
+            slope=slope, intercept=None if slope is None else 0.01, r_squared=r_squared, original_conc=conc,
+        )
+
+    def test_refresh_with_only_nonlinear_submissions(self):
+        self.add("ana", "Gatorade", 110.0)
+        self.add("ben", "Gatorade", 90.0)
+        summary = ClassSummary()
+        self.assertEqual(summary.refresh(self.store), 2)
+        row = summary.beverage_summary().loc["Gatorade"]
+        self.assertEqual(row["Submissions"], 2)
+        self.assertAlmostEqual(row["Mean (µg/mL)"], 100.0)
+        n, mean, _ = summary.class_statistics("slope")
+        self.assertEqual(n, 0)
+        self.assertTrue(np.isnan(mean))
+
+    def test_nonlinear_batch_after_linear_keeps_slope_range(self):
+        summary = ClassSummary()
+        self.add("ana", "Gatorade", 110.0, slope=0.0010, model="linear")
+        self.add("ben", "Gatorade", 100.0, slope=0.0012, model="linear")
+        summary.refresh(self.store)
+        self.add("cy", "Gatorade", 95.0)
+        summary.refresh(self.store)
+        slope = summary.moments["slope"].loc["Gatorade"]
+        self.assertEqual(slope["n"], 2)
+        self.assertAlmostEqual(slope["min"], 0.0010)
+        self.assertAlmostEqual(slope["max"], 0.0012)
+
+    def test_incremental_summary_matches_full_recompute(self):
+        rng = np.random.default_rng(0)
+        summary = ClassSummary()
+        for i in range(40):
+            # Students resubmit now and then, replacing their earlier result.
+            self.add(
+                f"s{i % 15}", ("Gatorade", "Kool-Aid", "Punch")[i % 3],
+                rng.normal(100, 15), slope=rng.normal(1e-3, 1e-4), r_squared=rng.uniform(0.9, 1.0), model="linear",
+            )
+            if i % 7 == 0:
+                summary.refresh(self.store)
+        summary.refresh(self.store)
+
+        full = self.store.fetch_since(0)
+        self.assertEqual(len(summary.submissions), len(full))
+        expected = full.groupby("beverage")["original_conc"].agg(["count", "mean", "std", "min", "max"])
+        actual = summary.beverage_summary()
+        np.testing.assert_allclose(
+            actual[["Submissions", "Mean (µg/mL)", "SD (µg/mL)", "Min (µg/mL)", "Max (µg/mL)"]].to_numpy(),
+            expected.to_numpy(),
+        )
+        n, mean, sd = summary.class_statistics("slope")
+        self.assertEqual(n, len(full))
+        self.assertAlmostEqual(mean, full["slope"].mean())
+        self.assertAlmostEqual(sd, full["slope"].std())
+
+    def test_flag_outliers(self):
+        for i, conc in enumerate([100, 101, 99, 100, 102, 98, 100, 101, 99, 100, 160]):
+            self.add(f"s{i}", "Gatorade", conc, slope=0.001, r_squared=0.99 if i else 0.9, model="linear")
+        summary = ClassSummary()
+        summary.refresh(self.store)
+        flags = summary.flag_outliers().set_index("student")["flag"]
+        self.assertIn("concentration", flags["s10"])
+        self.assertIn("R²", flags["s0"])
+        self.assertEqual(flags["s5"], "")
+
+
+if __name__ == "__main__":
+    unittest.main()